@@ -1,15 +1,35 @@
+import os
+import sys
+
 from flask import Flask
 from dash import Dash, html, dcc, Input, Output
-import plotly.express as px
 import pandas as pd
-import requests
-from io import BytesIO
+
+# The repo root holds the shared modules (and the bundle written by vercel.sh)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bundle  # noqa: E402
+import drive  # noqa: E402
+from timeline import build_scatter_figure  # noqa: E402
 
 server = Flask(__name__)
 app = Dash(__name__, server=server)
 
 # Cache the data
 CACHED_DATA = None
+CACHED_FIGURE = None
+# The bundle is only looked for once; without one every request falls back to the workbook quietly
+FIGURE_LOOKED_UP = False
+
+def load_figure():
+    """The scatter pre-serialized by the build step, or None without a bundle"""
+    global CACHED_FIGURE, FIGURE_LOOKED_UP
+    if not FIGURE_LOOKED_UP:
+        FIGURE_LOOKED_UP = True
+        try:
+            CACHED_FIGURE = bundle.load_figure(bundle.SCATTER_FIGURE)
+        except Exception as e:
+            print(f"Error loading bundle, using the Drive workbook instead: {str(e)}")
+    return CACHED_FIGURE
 
 def load_data():
     global CACHED_DATA
@@ -17,11 +37,8 @@ def load_data():
         return CACHED_DATA
         
     try:
-        file_id = '18Uz_n4Jp1EtXvCnQhqdGDFn1H7clLMyt'
-        url = f"https://drive.google.com/uc?export=download&id={file_id}"
-        response = requests.get(url)
-        df = pd.read_excel(BytesIO(response.content))
-        df.columns = df.columns.str.lower().str.replace(' ', '')
+        # Pooled, conditional and cached download of the Drive workbook (see drive.py)
+        df = drive.fetch_campaigns()
         CACHED_DATA = df
         return df
     except Exception as e:
@@ -54,27 +71,15 @@ app.layout = html.Div(
     Input('main-graph', 'id')
 )
 def update_graph(_):
+    fig = load_figure()
+    if fig is not None:
+        return fig
+
+    # No bundle (e.g. running outside a build): fetch and parse the workbook
     df = load_data()
     if df.empty:
         return {}
-    
-    fig = px.scatter(df,
-                    x='startdate',
-                    y='parentcampaignname',
-                    color='ecaactivitytype',
-                    title='Campaign Timeline')
-    
-    fig.update_layout(
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        title_x=0.5,
-        margin=dict(l=20, r=20, t=40, b=20),
-        xaxis_title="Start Date",
-        yaxis_title="Parent Campaign Name",
-        legend_title="ECA Activity Type"
-    )
-    
-    return fig
+    return build_scatter_figure(df)
 
 # For Vercel
 application = app.server
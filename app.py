@@ -1,27 +1,35 @@
+import os
+
 import pandas as pd
 import plotly.express as px
 from dash import Dash, html, dcc, Output, Input
 import dash_bootstrap_components as dbc
-import requests
-from io import BytesIO
+from flask import jsonify
+
+import drive
+from metrics import CallbackMetrics, callback_metrics_enabled
+from snapshot import SnapshotCache
+
+# Seconds a loaded workbook is served before a background refresh is started
+DATA_TTL = float(os.environ.get('ECA_DATA_TTL', 300))
+
+def fetch_data():
+    # Pooled, conditional and cached download of the Drive workbook (see drive.py)
+    return drive.fetch_campaigns()
+
+# Callbacks read the current snapshot; a stale one is refreshed in the background
+data_cache = SnapshotCache(fetch_data, ttl=DATA_TTL)
 
 def load_data():
     try:
-        # Your Google Drive file ID
-        file_id = '18Uz_n4Jp1EtXvCnQhqdGDFn1H7clLMyt'
-        url = f"https://drive.google.com/uc?export=download&id={file_id}"
-        
-        response = requests.get(url)
-        df = pd.read_excel(BytesIO(response.content))
-        df.columns = df.columns.str.lower().str.replace(' ', '')
-        return df
+        return data_cache.get()
     except Exception as e:
         print(f"Error: {str(e)}")
         return pd.DataFrame()
 
 def create_dash_app(server=None):
     app = Dash(__name__, 
-               server=server,
+               server=server if server is not None else True,
                url_base_pathname='/',
                external_stylesheets=[dbc.themes.BOOTSTRAP])
     
@@ -50,9 +58,22 @@ def create_dash_app(server=None):
                         color='ecaactivitytype',
                         title='Campaign Timeline')
         return fig
+
+    @app.server.route('/data-age')
+    def data_age():
+        # Snapshot age and refresh state, for monitoring
+        return jsonify(data_cache.info())
+
+    # Opt-in (ECA_CALLBACK_METRICS=1): per-callback latency, response size and errors at /metrics/callbacks
+    if callback_metrics_enabled():
+        CallbackMetrics().install(app)
     
     return app
 
+def create_server():
+    # WSGI entry point for gunicorn (see gunicorn.conf.py)
+    return create_dash_app().server
+
 if __name__ == '__main__':
     app = create_dash_app()
     app.run_server(debug=True) 
\ No newline at end of file
@@ -0,0 +1,121 @@
+// Clientside callbacks for the campaign timeline (website.py).
+//
+// filterTimeline redraws the timeline for a site from the integer-coded
+// columns in the timeline-columns store (timeline.timeline_columns), with
+// the same traces as timeline.build_figure_vectorized. Without the store it
+// hands the site to the server callback through timeline-site.
+// gateZoom only forwards zooms the server has to redraw (heatmap views).
+
+(function () {
+    function siteRows(c, site) {
+        var code = (site === null || site === undefined) ? null : c.sites.indexOf(site);
+        var rows = [];
+        for (var i = 0; i < c.campaign.length; i++) {
+            if (code === null || c.site[i] === code) {
+                rows.push(i);
+            }
+        }
+        return (code === -1) ? [] : rows;
+    }
+
+    function buildTimeline(c, site) {
+        var rows = siteRows(c, site);
+        if (!rows.length) {
+            return {data: [], layout: {}};
+        }
+        // Campaigns in order of first appearance, as the server figure ranks them
+        var rank = {};
+        var order = [];
+        var maxDays = {};
+        var maxDay = null;
+        var hasFirst = false;
+        rows.forEach(function (i) {
+            var campaign = c.campaign[i];
+            var day = c.days[i];
+            if (c.type[i] === 0) {
+                hasFirst = true;
+            }
+            if (day !== null && (maxDay === null || day > maxDay)) {
+                maxDay = day;
+            }
+            if (campaign < 0) {
+                return;
+            }
+            if (!(campaign in rank)) {
+                rank[campaign] = order.length;
+                order.push(campaign);
+                maxDays[campaign] = null;
+            }
+            if (day !== null && (maxDays[campaign] === null || day > maxDays[campaign])) {
+                maxDays[campaign] = day;
+            }
+        });
+
+        var data = [];
+        if (hasFirst) {
+            data.push({
+                type: 'bar',
+                name: 'Campaign span',
+                y: order.map(function (k) { return c.campaigns[k]; }),
+                x: order.map(function (k) { return maxDays[k]; }),
+                marker: {color: 'lightgray'},
+                width: 0.5,
+                orientation: 'h',
+                showlegend: false,
+                hovertemplate: '%{x}<extra>%{y}</extra>'
+            });
+        }
+        c.types.forEach(function (typeName, t) {
+            var points = rows.filter(function (i) {
+                var day = c.days[i];
+                return c.type[i] === t && c.campaign[i] >= 0 && day !== null && (t > 1 || day === 0);
+            });
+            if (!points.length) {
+                return;
+            }
+            // Array.prototype.sort is stable, like the server's argsort(kind='stable')
+            points.sort(function (a, b) { return rank[c.campaign[a]] - rank[c.campaign[b]]; });
+            var color = c.colors[t];
+            data.push({
+                type: c.trace,
+                y: points.map(function (i) { return c.campaigns[c.campaign[i]]; }),
+                x: points.map(function (i) { return c.days[i]; }),
+                mode: 'markers',
+                marker: {color: color, size: 10, symbol: 'line-ns', line: {width: 3, color: color}},
+                name: typeName,
+                showlegend: true,
+                customdata: points.map(function (i) { return [c.campaigns[c.campaign[i]], c.days[i], typeName]; }),
+                hovertemplate: 'Campaign: %{customdata[0]}<br>Interaction Type: ' + typeName +
+                    '<br>Days after first interaction: %{customdata[1]}<br>Click for details<extra></extra>'
+            });
+        });
+
+        var layout = JSON.parse(JSON.stringify(c.layout));
+        var tickvals = [];
+        for (var tick = 0; tick < Math.floor(maxDay) + 30; tick += 30) {
+            tickvals.push(tick);
+        }
+        layout.xaxis.range = [0, maxDay * 1.1];
+        layout.xaxis.tickvals = tickvals;
+        return {data: data, layout: layout};
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        eca: {
+            filterTimeline: function (site, columns) {
+                var noUpdate = window.dash_clientside.no_update;
+                if (!columns) {
+                    return [noUpdate, site === undefined ? null : site];
+                }
+                return [buildTimeline(columns, site), noUpdate];
+            },
+            gateZoom: function (relayoutData, view) {
+                if (!relayoutData || !view || view.kind === 'full') {
+                    return window.dash_clientside.no_update;
+                }
+                return relayoutData;
+            },
+            buildTimeline: buildTimeline
+        }
+    });
+})();
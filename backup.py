@@ -14,6 +14,9 @@ from dash.dependencies import Input, Output
 import dash_bootstrap_components as dbc
 import json  # Add this at the top with other imports
 import traceback
+
+from exports import export_outputs
+from timeline import build_figure
  
 
  ## this code has the 1st time ordered properly 
@@ -77,7 +80,6 @@ members_filtered = members_df[
     (members_df['Interaction Type'] == "1st Time Inquiry – Requested by Org or Group") | 
     (members_df['Interaction Type'] == "1st Time Outreach – Initiated by ECA Staff")
 ]
-members_filtered.to_excel(r"C:\Users\eilam\OneDrive\CEC\ECA Campaign Members_FY25_members_filtered.xlsx", index=False)
 
 # Get unique parent campaigns with first-time interactions
 unique_parent_campaigns = members_filtered['Parent Campaign: Campaign Name'].unique()
@@ -113,16 +115,6 @@ mask = (df_filtered['days_from_first'] > 0) & (
 )
 df_filtered.loc[mask, 'days_from_first'] = None  # Set to None to exclude from graph
 
-# Save the filtered dataframe to a new Excel file
-df_filtered.to_excel(r"C:\Users\eilam\OneDrive\CEC\ECA Campaigns_FY25_filtered_interactions.xlsx", index=False)
-
-# Save the binary data
-try:
-    df.to_excel(output_path, index=False)
-except PermissionError:
-    print("Please close any Excel applications that might be using the file and try again.")
-    exit()
-
 # Filter v2 file for first-time interactions
 v2_path = r"C:\Users\eilam\OneDrive\CEC\ECA Campaigns_FY25_ALL_v2.xlsx"
 v2_df = pd.read_excel(v2_path)
@@ -130,25 +122,37 @@ filtered_first_time = v2_df[
     (v2_df['Interaction Type'] == "1st Time Inquiry – Requested by Org or Group") | 
     (v2_df['Interaction Type'] == "1st Time Outreach – Initiated by ECA Staff")
 ]
-filtered_first_time.to_excel(r"C:\Users\eilam\OneDrive\CEC\ECA Campaigns_FY25_filtered_first_time.xlsx", index=False)
+
+# Save the outputs; the binary file stays in data\ as before
+saved = export_outputs({
+    'binary': df,
+    'filtered_interactions': df_filtered,
+    'members_filtered': members_filtered,
+    'filtered_first_time': filtered_first_time,
+}, os.path.dirname(output_path), "ECA Campaigns_FY25_outputs", paths={
+    'binary': os.path.splitext(output_path)[0],
+    'filtered_interactions': r"C:\Users\eilam\OneDrive\CEC\ECA Campaigns_FY25_filtered_interactions",
+    'members_filtered': r"C:\Users\eilam\OneDrive\CEC\ECA Campaign Members_FY25_members_filtered",
+    'filtered_first_time': r"C:\Users\eilam\OneDrive\CEC\ECA Campaigns_FY25_filtered_first_time",
+})
 
 # Print summary once at the end
 print("\nFiles created:")
 print(f"1. Binary indicators file")
-print(f"   - Saved to: {output_path}")
+print(f"   - Saved to: {saved['binary']}")
 print(f"   - Contains all interactions with binary columns")
 
 print(f"\n2. Filtered first-time interactions from v2 file")
 print(f"   - Contains {len(filtered_first_time)} interactions")
-print(f"   - Saved to: ECA Campaigns_FY25_filtered_first_time.xlsx")
+print(f"   - Saved to: {saved['filtered_first_time']}")
 
 print(f"\n3. Filtered first-time interactions from members file")
 print(f"   - Contains {len(members_filtered)} interactions")
-print(f"   - Saved to: ECA Campaign Members_FY25_members_filtered.xlsx")
+print(f"   - Saved to: {saved['members_filtered']}")
 
 print(f"\n4. Filtered interactions for parent campaigns with first-time interactions")
 print(f"   - Contains {len(df_filtered)} interactions")
-print(f"   - Saved to: ECA Campaigns_FY25_filtered_interactions.xlsx")
+print(f"   - Saved to: {saved['filtered_interactions']}")
 
 # Calculate statistics from correct sources
 v2_first_time_total = len(filtered_first_time)  # From v2 file
@@ -329,113 +333,8 @@ def update_time_graph(selected_site):
         if filtered_df.empty:
             return go.Figure()
 
-        # Define ordered list of interaction types
-        ordered_types = [
-            "1st Time Inquiry – Requested by Org or Group",    # Must be first
-            "1st Time Outreach – Initiated by ECA Staff",      # Must be second
-            "Follow Up Project Planning or Problem-Solving Meeting",
-            "Reoccurring activity",
-            "Repeat – For Purposes of Ongoing Participation or to Rep ECA",
-            "Community Meeting",
-            "Stand alone activity",
-            "Scheduling or Show-and-Tell Visit",
-            "Resident, Institutional or City Concern",
-            "Other, such as Room Request"
-        ]
-
-        # Define corresponding colors
-        color_map = {
-            ordered_types[0]: "#1f77b4",  # First Time Inquiry - Blue
-            ordered_types[1]: "#2ca02c",  # First Time Outreach - Green
-            ordered_types[2]: "#FF0000",  # Red
-            ordered_types[3]: "#00FF00",  # Green
-            ordered_types[4]: "#0000FF",  # Blue
-            ordered_types[5]: "#FFA500",  # Orange
-            ordered_types[6]: "#800080",  # Purple
-            ordered_types[7]: "#008080",  # Teal
-            ordered_types[8]: "#FF69B4",  # Pink
-            ordered_types[9]: "#808080"   # Gray
-        }
-
-        fig = go.Figure()
-        legend_items = []  # Use list instead of set to maintain order
-
-        # First, add all traces in the correct order
-        for interaction_type in ordered_types:
-            # Check if this interaction type exists in the filtered data
-            type_data = filtered_df[filtered_df['interactiontype'] == interaction_type]
-            if not type_data.empty:
-                for parent_campaign in filtered_df['parentcampaignname'].unique():
-                    campaign_data = type_data[type_data['parentcampaignname'] == parent_campaign]
-                    
-                    # Add gray bar if this is the first interaction type
-                    if interaction_type == ordered_types[0]:
-                        max_days = filtered_df[filtered_df['parentcampaignname'] == parent_campaign]['days_from_first'].max()
-                        fig.add_trace(go.Bar(
-                            name=parent_campaign,
-                            y=[parent_campaign],
-                            x=[max_days],
-                            marker_color='lightgray',
-                            width=0.5,
-                            orientation='h',
-                            showlegend=False
-                        ))
-
-                    # Add markers for this interaction type
-                    for _, row in campaign_data.iterrows():
-                        # Skip first-time interactions that aren't at day 0
-                        if ("1st Time" in interaction_type and row['days_from_first'] != 0):
-                            continue
-                        
-                        fig.add_trace(go.Scatter(
-                            y=[parent_campaign],
-                            x=[row['days_from_first']],
-                            mode='markers',
-                            marker=dict(
-                                color=color_map[interaction_type],
-                                size=10,
-                                symbol='line-ns',
-                                line=dict(width=3, color=color_map[interaction_type])
-                            ),
-                            name=interaction_type,
-                            showlegend=(interaction_type not in legend_items),
-                            customdata=[[parent_campaign, int(row['days_from_first']), interaction_type]],
-                            hovertemplate=(
-                                f"Campaign: {parent_campaign}<br>"
-                                f"Interaction Type: {interaction_type}<br>"
-                                f"Days after first interaction: {int(row['days_from_first'])}<br>"
-                                f"Click for details<extra></extra>"
-                            )
-                        ))
-                        if interaction_type not in legend_items:
-                            legend_items.append(interaction_type)
-
-        # Update layout with legend configuration
-        fig.update_layout(
-            title="Campaign Timeline by Parent Campaign",
-            yaxis_title="Parent Campaign",
-            xaxis_title="Days Since First Interaction",
-            xaxis=dict(
-                range=[0, filtered_df['days_from_first'].max() * 1.1],
-                tickmode="array",
-                tickvals=list(range(0, int(filtered_df['days_from_first'].max()) + 30, 30)),
-                gridcolor='lightgray',
-                griddash='dot',
-                showgrid=True
-            ),
-            showlegend=True,
-            legend_title="Interaction Types",
-            template="plotly_white",
-            height=600,
-            barmode='overlay',
-            legend=dict(
-                yanchor="top",
-                y=0.99,
-                xanchor="left",
-                x=1.02,
-                traceorder='normal'  # Use normal trace order as we're adding traces in the desired order
-            )
-        )
+        # One marker trace per interaction type plus a single Bar for the campaign spans
+        fig = build_figure(filtered_df)
 
         return fig
 
@@ -523,7 +422,6 @@ members_filtered = members_df[
     (members_df['Interaction Type'] == "1st Time Inquiry – Requested by Org or Group") | 
     (members_df['Interaction Type'] == "1st Time Outreach – Initiated by ECA Staff")
 ]
-members_filtered.to_excel(r"C:\Users\eilam\OneDrive\CEC\ECA Campaign Members_FY25_members_filtered.xlsx", index=False)
 
 # Get unique parent campaigns with first-time interactions
 unique_parent_campaigns = members_filtered['Parent Campaign: Campaign Name'].unique()
@@ -542,16 +440,6 @@ df_filtered['total_interactions'] = df_filtered.groupby('parentcampaignname')['i
 # Calculate days from first-time interaction
 df_filtered['days_from_first'] = df_filtered.groupby('parentcampaignname')['num_startdate'].transform(lambda x: x - x.min())
 
-# Save the filtered dataframe to a new Excel file
-df_filtered.to_excel(r"C:\Users\eilam\OneDrive\CEC\ECA Campaigns_FY25_filtered_interactions.xlsx", index=False)
-
-# Save the binary data
-try:
-    df.to_excel(output_path, index=False)
-except PermissionError:
-    print("Please close any Excel applications that might be using the file and try again.")
-    exit()
-
 # Filter v2 file for first-time interactions
 v2_path = r"C:\Users\eilam\OneDrive\CEC\ECA Campaigns_FY25_ALL_v2.xlsx"
 v2_df = pd.read_excel(v2_path)
@@ -559,25 +447,37 @@ filtered_first_time = v2_df[
     (v2_df['Interaction Type'] == "1st Time Inquiry – Requested by Org or Group") | 
     (v2_df['Interaction Type'] == "1st Time Outreach – Initiated by ECA Staff")
 ]
-filtered_first_time.to_excel(r"C:\Users\eilam\OneDrive\CEC\ECA Campaigns_FY25_filtered_first_time.xlsx", index=False)
+
+# Save the outputs with the dashes and parent CEC removed
+saved = export_outputs({
+    'binary': df,
+    'filtered_interactions': df_filtered,
+    'members_filtered': members_filtered,
+    'filtered_first_time': filtered_first_time,
+}, os.path.dirname(output_path), "ECA Campaigns_FY25_outputs", paths={
+    'binary': os.path.splitext(output_path)[0],
+    'filtered_interactions': r"C:\Users\eilam\OneDrive\CEC\ECA Campaigns_FY25_filtered_interactions",
+    'members_filtered': r"C:\Users\eilam\OneDrive\CEC\ECA Campaign Members_FY25_members_filtered",
+    'filtered_first_time': r"C:\Users\eilam\OneDrive\CEC\ECA Campaigns_FY25_filtered_first_time",
+})
 
 # Print summary once at the end
 print("\nFiles created:")
 print(f"1. Binary indicators file")
-print(f"   - Saved to: {output_path}")
+print(f"   - Saved to: {saved['binary']}")
 print(f"   - Contains all interactions with binary columns")
 
 print(f"\n2. Filtered first-time interactions from v2 file")
 print(f"   - Contains {len(filtered_first_time)} interactions")
-print(f"   - Saved to: ECA Campaigns_FY25_filtered_first_time.xlsx")
+print(f"   - Saved to: {saved['filtered_first_time']}")
 
 print(f"\n3. Filtered first-time interactions from members file")
 print(f"   - Contains {len(members_filtered)} interactions")
-print(f"   - Saved to: ECA Campaign Members_FY25_members_filtered.xlsx")
+print(f"   - Saved to: {saved['members_filtered']}")
 
 print(f"\n4. Filtered interactions for parent campaigns with first-time interactions")
 print(f"   - Contains {len(df_filtered)} interactions")
-print(f"   - Saved to: ECA Campaigns_FY25_filtered_interactions.xlsx")
+print(f"   - Saved to: {saved['filtered_interactions']}")
 
 # Calculate statistics from correct sources
 v2_first_time_total = len(filtered_first_time)  # From v2 file
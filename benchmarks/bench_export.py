@@ -0,0 +1,72 @@
+"""Time the export stage sequentially and with a worker pool.
+
+    python benchmarks/bench_export.py [--rows 50000] [--formats xlsx csv parquet] [--workers 4]
+
+The four outputs are the processed frames from the frame cache (run the
+dashboard or frame_cache.py once first), repeated to --rows rows each. The
+last check points one target at a directory: that output must fail on its
+own while the other three are still written.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import frame_cache  # noqa: E402
+from exports import export_outputs, sibling_path  # noqa: E402
+
+
+def outputs(rows):
+    cache = frame_cache.cache_dir()
+    frames = {
+        'binary': 'df', 'filtered_interactions': 'df_filtered',
+        'members_filtered': 'members_filtered', 'filtered_first_time': 'members_df',
+    }
+    result = {}
+    for name, frame_name in frames.items():
+        frame = pd.read_parquet(os.path.join(cache, frame_name + '.parquet'))
+        repeats = -(-rows // len(frame))
+        result[name] = pd.concat([frame] * repeats, ignore_index=True).iloc[:rows]
+    return result
+
+
+def timed(frames, directory, fmt, workers, pool):
+    start = time.perf_counter()
+    export_outputs(frames, directory, 'bench', fmt=fmt, workers=workers, pool=pool)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--formats', nargs='+', default=['xlsx', 'csv', 'parquet'])
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    frames = outputs(args.rows)
+    directory = tempfile.mkdtemp(prefix='eca_export_')
+    try:
+        table = []
+        for fmt in args.formats:
+            for workers, pool in ((1, 'thread'), (args.workers, 'thread'), (args.workers, 'process')):
+                table.append((fmt, workers, pool, timed(frames, directory, fmt, workers, pool)))
+        print(f"\n{'format':>8} {'workers':>7} {'pool':>8} {'wall_s':>7}")
+        for fmt, workers, pool, seconds in table:
+            print(f"{fmt:>8} {workers:>7} {pool:>8} {seconds:>7.2f}")
+
+        # Error isolation: one unwritable target, three good files, no stray temporaries
+        blocked = sibling_path(directory, 'isolation', 'members_filtered', 'csv')
+        os.makedirs(blocked)
+        saved = export_outputs(frames, directory, 'isolation', fmt='csv', workers=args.workers)
+        assert saved['members_filtered'].startswith('NOT SAVED')
+        assert all(os.path.isfile(saved[name]) for name in saved if name != 'members_filtered')
+        assert not [f for f in os.listdir(directory) if '.tmp-' in f]
+        print("\nerror isolation: OK")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,115 @@
+"""Exercise drive.Fetcher against a local stand-in for Google Drive.
+
+    python benchmarks/bench_fetch.py [--workbook data/X.xlsx] [--clients 8] [--delay 0.2]
+
+The stand-in serves one workbook with an ETag and Last-Modified, answers
+conditional requests with 304 and counts the bodies it sends. The script
+checks cold download, revalidation, single-flight coalescing, recovery from
+a corrupted cache file and serving the cached copy when the server is gone.
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drive import Fetcher  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_server(body, delay):
+    etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+    last_modified = formatdate(time.time(), usegmt=True)
+    counts = {'requests': 0, 'bodies': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            counts['requests'] += 1
+            time.sleep(delay)
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            counts['bodies'] += 1
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, counts
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<28} {time.perf_counter() - start:>7.3f}s")
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workbook', default=os.path.join(ROOT, 'data', 'ECA Campaigns_FY25_ALL.xlsx'))
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--delay', type=float, default=0.2, help='server latency per request (s)')
+    args = parser.parse_args()
+
+    with open(args.workbook, 'rb') as fh:
+        body = fh.read()
+    server, counts = make_server(body, args.delay)
+    url = 'http://127.0.0.1:%d/uc?export=download' % server.server_address[1]
+    cache_dir = tempfile.mkdtemp(prefix='eca_fetch_')
+    try:
+        # Concurrent cold start: every client waits on one download and one parse
+        fetcher = Fetcher(cache_dir=cache_dir)
+        threads = [threading.Thread(target=fetcher.read_excel, args=(url,)) for _ in range(args.clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print(f"{'cold, %d concurrent' % args.clients:<28} {time.perf_counter() - start:>7.3f}s")
+        assert counts['bodies'] == 1 and fetcher.stats['parses'] == 1, (counts, fetcher.stats)
+
+        # Same process again: a 304 and no parse
+        frame = timed('revalidate (304)', lambda: fetcher.read_excel(url))
+        assert counts['bodies'] == 1 and fetcher.stats['not_modified'] == 1
+
+        # New process, warm /tmp: a 304, one parse
+        fresh = Fetcher(cache_dir=cache_dir)
+        timed('new instance, warm cache', lambda: fresh.read_excel(url))
+        assert counts['bodies'] == 1 and fresh.stats['not_modified'] == 1
+
+        # A damaged cache file fails its checksum and is downloaded again
+        body_path, _ = fresh._paths(url)
+        with open(body_path, 'r+b') as fh:
+            fh.write(b'corrupt')
+        timed('corrupted cache', lambda: Fetcher(cache_dir=cache_dir).fetch(url))
+        assert counts['bodies'] == 2
+
+        # Server gone: the cached copy is served
+        server.shutdown()
+        server.server_close()
+        offline = Fetcher(cache_dir=cache_dir, timeout=(1, 1))
+        offline_frame = timed('server down', lambda: offline.read_excel(url))
+        assert offline.stats['stale_served'] == 1 and offline_frame.equals(frame)
+
+        print(f"server: {counts['requests']} requests, {counts['bodies']} bodies sent; "
+              f"rows: {len(frame)}")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
@@ -0,0 +1,69 @@
+"""Compare the categorical flag encoder with the old per-column string comparisons.
+
+    python benchmarks/bench_flags.py [--rows 100000 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import (  # noqa: E402
+    INTERACTION_FLAGS, add_flags, add_interaction_type_flags, interaction_column_name
+)
+
+INTERACTION_TYPES = sorted({value for values in INTERACTION_FLAGS.values() for value in values})
+
+
+def legacy_flags(df):
+    """The twelve comparisons plus per-type loop the scripts used to run"""
+    df['meeting'] = (df['ecaactivitytype'] == 'Meeting').astype(int)
+    df['event'] = (df['ecaactivitytype'] == 'Event').astype(int)
+    for name, values in INTERACTION_FLAGS.items():
+        hit = df['interactiontype'] == values[0]
+        for value in values[1:]:
+            hit |= df['interactiontype'] == value
+        df[name] = hit.astype(int)
+    for interaction in df['interactiontype'].dropna().unique():
+        df[interaction_column_name(interaction)] = (df['interactiontype'] == interaction).astype(int)
+    return df
+
+
+def encoded_flags(df):
+    df = add_flags(df)
+    return add_interaction_type_flags(df, df['interactiontype'].dropna().unique())
+
+
+def synthetic(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'ecaactivitytype': np.array(['Meeting', 'Event', None], dtype=object)[rng.integers(0, 3, rows)],
+        'interactiontype': np.array(INTERACTION_TYPES + [None], dtype=object)[rng.integers(0, len(INTERACTION_TYPES) + 1, rows)],
+    })
+
+
+def measure(fn, frame):
+    base_bytes = frame.memory_usage(deep=False).sum()
+    start = time.perf_counter()
+    out = fn(frame.copy())
+    elapsed = time.perf_counter() - start
+    return elapsed, out.memory_usage(deep=False).sum() - base_bytes, out
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'legacy_s':>9} {'encoded_s':>9} {'legacy_MB':>9} {'encoded_MB':>10}")
+    for rows in args.rows:
+        frame = synthetic(rows)
+        legacy_s, legacy_bytes, legacy = measure(legacy_flags, frame)
+        encoded_s, encoded_bytes, encoded = measure(encoded_flags, frame)
+        flag_columns = encoded.columns.difference(frame.columns)
+        assert (legacy[flag_columns] == encoded[flag_columns]).all().all()
+        print(f"{rows:>9} {legacy_s:>9.3f} {encoded_s:>9.3f} {legacy_bytes / 1e6:>9.1f} {encoded_bytes / 1e6:>10.1f}")
@@ -0,0 +1,267 @@
+"""Time every pipeline stage and the dashboard callbacks at several data scales.
+
+    python benchmarks/bench_pipeline.py [--rows 1000 10000 100000] [--format xlsx|csv|parquet]
+                                        [--export-format csv] [--repeat 5]
+                                        [--save PATH] [--compare BASELINE.json] [--threshold 0.2]
+
+For each scale, create_sample_data.py generates campaign and member exports
+(two member rows per campaign row) into a temporary directory. The stages
+then run in the order build_frames runs them: load, date split, flags,
+filtering, days_from_first, name cleaning, compact and member index, then
+export of the scripts' four outputs. The callbacks go through the Flask
+test client, so request parsing and JSON serialization are timed too:
+layout (GET /_dash-layout), update_time_graph for the whole timeline and
+for one site, and toggle_modal for the campaign with the most members.
+Cold callback times clear the figure and modal caches first. Warm times
+are the median of --repeat calls.
+
+Results are saved as JSON (default: benchmarks/results/pipeline-<time>.json).
+With --compare, each timing is checked against a saved run. A timing is a
+regression when it is more than --threshold slower and more than
+--min-delta seconds slower. The script exits 1 if it finds any.
+
+Excel sheets stop at about a million rows, so use --format parquet for
+larger scales. Around 10M rows the frames need tens of GB of memory.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+os.environ.setdefault('ECA_WARMUP', '0')
+os.environ.setdefault('ECA_METRICS_LOG', '0')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import create_sample_data  # noqa: E402
+import website  # noqa: E402
+from exports import export_outputs  # noqa: E402
+from pipeline import (  # noqa: E402
+    FIRST_TIME_TYPES, add_days_from_first, add_flags, build_member_index, campaign_member_counts,
+    clean_campaign_names, compact_frames, excel_reader, filter_interactions, filter_members,
+    first_interaction_days, headline_stats, normalize_columns, split_dates,
+)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+class Timer:
+    def __init__(self):
+        self.timings = {}
+
+    def __call__(self, name, work, *args):
+        start = time.perf_counter()
+        result = work(*args)
+        self.timings[name] = time.perf_counter() - start
+        return result
+
+
+def read_export(path):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    return excel_reader()(path)
+
+
+def run_stages(timer, campaigns_path, members_path, export_dir, export_fmt):
+    """The build_frames stages one at a time; returns the dashboard's data dict"""
+    raw = timer('load', read_export, campaigns_path)
+    members_df = timer('load_members', read_export, members_path)
+    # The generated campaigns export is also the v2 export; the scripts write its first-time rows as-is
+    # (taken before normalize_columns renames the columns in place)
+    first_time = raw[raw['Interaction Type'].isin(FIRST_TIME_TYPES)]
+
+    df = timer('date_split', lambda: split_dates(normalize_columns(raw)))
+    df = timer('flags', add_flags, df)
+
+    def filtering():
+        members_filtered = filter_members(members_df).copy()
+        parents = members_filtered['Parent Campaign: Campaign Name'].unique()
+        return members_filtered, filter_interactions(df, parents)
+    members_filtered, df_filtered = timer('filtering', filtering)
+    df_filtered = timer('days_from_first', add_days_from_first, df_filtered)
+
+    stats = headline_stats(members_filtered, int(df['firsttime'].sum()))
+    timer('name_cleaning', clean_campaign_names, df, df_filtered, members_df, members_filtered)
+    frames = timer('compact', compact_frames, {
+        'df': df,
+        'df_filtered': df_filtered,
+        'members_df': members_df,
+        'members_filtered': members_filtered,
+        'first_interactions': first_interaction_days(df_filtered).reset_index(),
+    })
+    member_index = timer('member_index', build_member_index, frames['members_df'])
+
+    outputs = {
+        'binary': frames['df'], 'filtered_interactions': frames['df_filtered'],
+        'members_filtered': frames['members_filtered'],
+        'filtered_first_time': first_time,
+    }
+    timer('export', export_outputs, outputs, export_dir, 'bench', export_fmt)
+    return dict(frames, **stats, member_index=member_index,
+                campaign_members=campaign_member_counts(frames['members_filtered']))
+
+
+def dash_update(client, output, outputs, inputs, changed, state=()):
+    response = client.post('/_dash-update-component', json={
+        'output': output, 'outputs': outputs, 'inputs': inputs, 'changedPropIds': changed, 'state': list(state),
+    })
+    if response.status_code not in (200, 204):
+        raise RuntimeError(f"{output}: HTTP {response.status_code}")
+    return len(response.data)
+
+
+def time_graph_request(client, site, relayout=None, view=None):
+    # The figure output is shared with the clientside filter, so its key carries a hash
+    output = next(key for key in website.app.callback_map if 'timeline-view.data' in key)
+    return dash_update(
+        client, output,
+        [{'id': 'time-graph', 'property': 'figure'}, {'id': 'timeline-view', 'property': 'data'}],
+        [{'id': 'timeline-site', 'property': 'data', 'value': site},
+         {'id': 'timeline-zoom', 'property': 'data', 'value': relayout}],
+        ['timeline-zoom.data' if relayout else 'timeline-site.data'],
+        [{'id': 'timeline-view', 'property': 'data', 'value': view}])
+
+
+def modal_request(client, campaign):
+    button = {'index': campaign, 'type': 'campaign-button'}
+    return dash_update(
+        client, '..campaign-modal.is_open...campaign-details-body.children..',
+        [{'id': 'campaign-modal', 'property': 'is_open'}, {'id': 'campaign-details-body', 'property': 'children'}],
+        [[{'id': button, 'property': 'n_clicks', 'value': 1}],
+         {'id': 'time-graph', 'property': 'clickData', 'value': None},
+         {'id': 'close-modal', 'property': 'n_clicks', 'value': None}],
+        [json.dumps(button, separators=(',', ':'), sort_keys=True) + '.n_clicks'])
+
+
+def largest_campaign(member_index):
+    def members(subs):
+        return sum(len(names) for affiliations in subs.values() for names in affiliations.values())
+    return max(member_index, key=lambda name: members(member_index[name]))
+
+
+def run_callbacks(timer, data, repeat):
+    """Time the layout and the two main callbacks against data; returns payload sizes"""
+    website._data = data
+    website.figure_cache.invalidate()
+    website.zoom_cache.invalidate()
+    website.render_campaign_details.cache_clear()
+    client = website.app.server.test_client()
+    site = data['df_filtered']['site'].value_counts().index[0]
+    campaign = largest_campaign(data['member_index']) if data['member_index'] else None
+
+    requests = {
+        'layout': lambda: len(client.get('/_dash-layout').data),
+        'update_time_graph': lambda: time_graph_request(client, None),
+        'update_time_graph_site': lambda: time_graph_request(client, site),
+    }
+    if campaign is not None:
+        requests['toggle_modal'] = lambda: modal_request(client, campaign)
+
+    sizes = {}
+    for name, request in requests.items():
+        sizes[name] = timer(name + '_cold', request)
+        warm = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            request()
+            warm.append(time.perf_counter() - start)
+        timer.timings[name + '_warm'] = statistics.median(warm)
+    return sizes
+
+
+def run_scale(rows, fmt, export_fmt, repeat):
+    directory = tempfile.mkdtemp(prefix='eca_bench_')
+    try:
+        start = time.perf_counter()
+        campaigns_path, members_path = create_sample_data.write_exports(rows, directory, fmt=fmt)
+        generated = time.perf_counter() - start
+        print(f"\n=== {rows:,} campaign rows ({fmt or 'auto'}; generated in {generated:.1f}s) ===")
+
+        timer = Timer()
+        export_dir = os.path.join(directory, 'exports')
+        os.makedirs(export_dir)
+        data = run_stages(timer, campaigns_path, members_path, export_dir, export_fmt)
+        data['data_version'] = f"bench-{rows}-{time.time()}"
+        sizes = run_callbacks(timer, data, repeat)
+        return {'timings': timer.timings, 'payload_bytes': sizes,
+                'frame_rows': {name: len(data[name]) for name in ('df', 'df_filtered', 'members_df', 'members_filtered')}}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def print_table(results):
+    scales = list(results)
+    names = list(dict.fromkeys(name for scale in scales for name in results[scale]['timings']))
+    print(f"\n{'stage':>28}" + ''.join(f"{scale:>12}" for scale in scales))
+    for name in names:
+        cells = ''.join(
+            f"{results[scale]['timings'][name]:>12.4f}" if name in results[scale]['timings'] else f"{'-':>12}"
+            for scale in scales)
+        print(f"{name:>28}{cells}")
+
+
+def compare(results, baseline, threshold, min_delta):
+    """Print current vs baseline for every timing both runs have; return the regressions"""
+    regressions = []
+    print(f"\n{'scale':>10} {'stage':>28} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for scale, result in results.items():
+        before = baseline['scales'].get(scale, {}).get('timings', {})
+        for name, seconds in result['timings'].items():
+            if name not in before:
+                continue
+            ratio = seconds / max(before[name], 1e-9)
+            regressed = ratio > 1 + threshold and seconds - before[name] > min_delta
+            if regressed:
+                regressions.append((scale, name))
+            print(f"{scale:>10} {name:>28} {before[name]:>10.4f} {seconds:>10.4f} {ratio:>7.2f}"
+                  + ("  REGRESSION" if regressed else ""))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--format', choices=['xlsx', 'csv', 'parquet'], default=None,
+                        help="generated export format (default: xlsx while it fits, else parquet)")
+    parser.add_argument('--export-format', default='csv')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', default=None)
+    parser.add_argument('--compare', default=None)
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--min-delta', type=float, default=0.05)
+    args = parser.parse_args()
+
+    results = {str(rows): run_scale(rows, args.format, args.export_format, args.repeat) for rows in args.rows}
+    print_table(results)
+
+    run = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'format': args.format,
+        'export_format': args.export_format,
+        'scales': results,
+    }
+    save = args.save or os.path.join(RESULTS_DIR, time.strftime('pipeline-%Y%m%d-%H%M%S.json'))
+    os.makedirs(os.path.dirname(os.path.abspath(save)), exist_ok=True)
+    with open(save, 'w') as fh:
+        json.dump(run, fh, indent=2)
+    print(f"\nSaved results to {save}")
+
+    if args.compare:
+        with open(args.compare) as fh:
+            regressions = compare(results, json.load(fh), args.threshold, args.min_delta)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): " + ', '.join(f"{name}@{scale}" for scale, name in regressions))
+            sys.exit(1)
+        print("\nNo regressions")
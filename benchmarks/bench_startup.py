@@ -0,0 +1,43 @@
+"""Measure how long website.py takes to import and to get its data ready.
+
+    python benchmarks/bench_startup.py [--repeat 3]
+
+Each run is a fresh interpreter. "import" is the time until the server could
+accept requests (ECA_WARMUP=0, so nothing is loaded); "ready" adds get_data()
+on top, either rebuilding the frame cache (cold) or reading it (warm).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import website
+imported = time.perf_counter() - start
+website.get_data()
+print(json.dumps({'import': imported, 'ready': time.perf_counter() - start}))
+"""
+
+
+def run(rebuild):
+    env = dict(os.environ, ECA_WARMUP='0', ECA_REBUILD_CACHE='1' if rebuild else '0')
+    out = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'cache':>6} {'import_s':>9} {'ready_s':>8}")
+    for label, rebuild in (('cold', True), ('warm', False)):
+        for _ in range(args.repeat):
+            timing = run(rebuild)
+            print(f"{label:>6} {timing['import']:>9.3f} {timing['ready']:>8.3f}")
@@ -0,0 +1,59 @@
+"""Time the timeline figure build and measure its JSON size in each mode.
+
+    python benchmarks/bench_timeline.py [--rows 500 2000 10000] [--legacy-max 5000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timeline import TIMELINE_MODES, build_figure, ordered_types  # noqa: E402
+
+
+def synthetic_filtered(rows, campaigns=None, seed=0):
+    """A df_filtered-shaped frame with one day-0 first-time row per campaign"""
+    rng = np.random.default_rng(seed)
+    campaigns = campaigns or max(1, rows // 8)
+    names = np.array([f"Campaign {i:05d}" for i in range(campaigns)], dtype=object)
+    parent = names[rng.integers(0, campaigns, rows)]
+    types = np.array(ordered_types[2:], dtype=object)[rng.integers(0, len(ordered_types) - 2, rows)]
+    days = rng.integers(1, 365, rows).astype(float)
+    first = pd.DataFrame({
+        'parentcampaignname': names,
+        'interactiontype': np.array(ordered_types[:2], dtype=object)[rng.integers(0, 2, campaigns)],
+        'days_from_first': 0.0,
+    })
+    rest = pd.DataFrame({'parentcampaignname': parent, 'interactiontype': types, 'days_from_first': days})
+    df = pd.concat([first, rest], ignore_index=True)
+    df['site'] = np.array(['Homewood', 'Hill', 'Oakland', 'Hazelwood'], dtype=object)[rng.integers(0, 4, len(df))]
+    return df
+
+
+def run(rows_list, legacy_max):
+    print(f"{'rows':>8} {'mode':>8} {'traces':>8} {'build_s':>9} {'json_kb':>9}")
+    for rows in rows_list:
+        frame = synthetic_filtered(rows)
+        for mode in TIMELINE_MODES:
+            if mode == 'legacy' and rows > legacy_max:
+                print(f"{rows:>8} {mode:>8} {'skipped':>8}")
+                continue
+            start = time.perf_counter()
+            fig = build_figure(frame, mode=mode)
+            payload = pio.to_json(fig)
+            elapsed = time.perf_counter() - start
+            print(f"{rows:>8} {mode:>8} {len(fig.data):>8} {elapsed:>9.3f} {len(payload) / 1024:>9.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[500, 2000, 10000])
+    parser.add_argument('--legacy-max', type=int, default=5000,
+                        help="skip the legacy builder above this many rows (it is O(rows) traces)")
+    args = parser.parse_args()
+    run(args.rows, args.legacy_max)
@@ -0,0 +1,203 @@
+"""Build-time artifact bundle for the deployed dashboard.
+
+vercel.sh runs this once per deployment. It runs the pipeline and writes a
+directory that the runtime can load without touching any workbook:
+
+    manifest.json     version, source fingerprints, stats, file index
+    *.parquet         the processed frames (same files as the frame cache)
+    aggregates.json   member index, per-campaign member counts and the
+                      /api/* payloads
+    figures/*.json    pre-serialized timeline figures, one per site, plus
+                      the start-date scatter served by api/index.py
+
+    python bundle.py [--campaigns X.xlsx] [--members Y.xlsx] [--v2 Z.xlsx] [--out DIR]
+
+The inputs default to the workbooks website.py loads (paths.py). The scatter
+is built from the Drive workbook, exactly as api/index.py builds it when
+there is no bundle. When the workbooks are missing (the usual case on
+Vercel) only the scatter is bundled and a warning is printed; when the
+scatter cannot be fetched either, nothing is written and the script exits 1.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import plotly.io as pio
+
+import drive
+import frame_cache
+import paths
+from metrics import timed
+from pipeline import build_frames, build_member_index, campaign_member_counts
+from rest_api import compute_payloads
+from timeline import build_scatter_figure, build_timeline
+
+# Bump whenever the bundle layout or its contents change
+BUNDLE_VERSION = 6
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUNDLE_DIR = os.path.join(BASE_DIR, "bundle")
+MANIFEST_NAME = "manifest.json"
+SCATTER_FIGURE = "campaign_scatter"
+
+
+def bundle_dir():
+    return os.environ.get("ECA_BUNDLE_DIR", DEFAULT_BUNDLE_DIR)
+
+
+def aggregates(frames, stats):
+    return {
+        'member_index': build_member_index(frames['members_df']),
+        'campaign_members': campaign_member_counts(frames['members_filtered']),
+        # Payloads of the /api/* endpoints (rest_api.py)
+        'api': compute_payloads(dict(frames, **stats)),
+    }
+
+
+def site_figures(df_filtered):
+    """(site, figure) for the unzoomed timeline, unfiltered and for every site in the data"""
+    yield None, build_timeline(df_filtered)
+    if 'site' in df_filtered.columns:
+        for site in df_filtered['site'].dropna().unique():
+            yield site, build_timeline(df_filtered[df_filtered['site'] == site])
+
+
+def scatter_figure():
+    """The start-date scatter, from the same Drive workbook and columns api/index.py falls back to"""
+    return build_scatter_figure(drive.fetch_campaigns())
+
+
+def write_bundle(directory, sources, frames, stats, scatter=None):
+    """Write frames, aggregates and figures; the manifest goes last so a partial bundle never loads
+
+    With no frames only the scatter is written; website.py never loads such a bundle.
+    """
+    fingerprints = {name: frame_cache.fingerprint(path) for name, path in sources.items()}
+    stats = dict(stats, data_version=frame_cache.version_of(fingerprints))
+
+    tmp_dir = directory + ".tmp-%d" % os.getpid()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_dir, "figures"))
+    try:
+        frame_files = {}
+        for name, frame in frames.items():
+            frame_files[name] = name + ".parquet"
+            frame.to_parquet(os.path.join(tmp_dir, frame_files[name]))
+
+        # JSON object keys must be strings, so sites are stored as [site, file] pairs
+        timelines = []
+        if frames:
+            with open(os.path.join(tmp_dir, "aggregates.json"), "w") as fh:
+                json.dump(aggregates(frames, stats), fh)
+            for i, (site, fig) in enumerate(site_figures(frames['df_filtered'])):
+                filename = os.path.join("figures", "timeline-%d.json" % i)
+                with open(os.path.join(tmp_dir, filename), "w") as fh:
+                    fh.write(pio.to_json(fig))
+                timelines.append([site, filename])
+        figures = {}
+        if scatter is not None:
+            figures[SCATTER_FIGURE] = os.path.join("figures", SCATTER_FIGURE + ".json")
+            with open(os.path.join(tmp_dir, figures[SCATTER_FIGURE]), "w") as fh:
+                fh.write(pio.to_json(scatter))
+
+        manifest = {
+            "version": BUNDLE_VERSION,
+            "created": time.time(),
+            "sources": fingerprints,
+            "frames": frame_files,
+            "stats": stats,
+            "aggregates": "aggregates.json" if frames else None,
+            "timelines": timelines,
+            "figures": figures,
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), "w") as fh:
+            json.dump(manifest, fh, indent=2)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return manifest
+
+
+def read_manifest(directory=None):
+    try:
+        with open(os.path.join(directory or bundle_dir(), MANIFEST_NAME)) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == BUNDLE_VERSION else None
+
+
+def usable(manifest, sources):
+    """Use the bundle when the workbooks are not deployed, or when they are exactly what it was built from"""
+    if manifest is None or not manifest["frames"]:
+        return False
+    if not all(os.path.exists(path) for path in sources.values()):
+        return True
+    if set(manifest["sources"]) != set(sources):
+        return False
+    return all(frame_cache._source_unchanged(manifest["sources"][name], path) for name, path in sources.items())
+
+
+@timed(name='bundle_load')
+def load(directory=None, manifest=None):
+    """Return a dict of frames, stats, aggregates and timeline figures (as dicts, keyed by site)"""
+    directory = directory or bundle_dir()
+    manifest = manifest or read_manifest(directory)
+    frames, stats = frame_cache.load(directory, manifest)
+    with open(os.path.join(directory, manifest["aggregates"])) as fh:
+        data = dict(frames, **stats, **json.load(fh))
+    data['timeline_figures'] = {site: os.path.join(directory, filename) for site, filename in manifest["timelines"]}
+    return data
+
+
+def load_figure(name, directory=None):
+    """Pre-serialized figure as a dict, or None when there is no bundle"""
+    directory = directory or bundle_dir()
+    manifest = read_manifest(directory)
+    if manifest is None or name not in manifest["figures"]:
+        return None
+    return read_figure(os.path.join(directory, manifest["figures"][name]))
+
+
+def read_figure(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def build_bundle(input_path, members_path, v2_path, directory=None, scatter=None):
+    directory = directory or bundle_dir()
+    start = time.perf_counter()
+    sources = {'input': input_path, 'members': members_path, 'v2': v2_path}
+    frames, stats = build_frames(input_path, members_path, v2_path)
+    manifest = write_bundle(directory, sources, frames, stats, scatter)
+    print(f"Wrote bundle to {directory} ({len(manifest['timelines'])} timeline figures, "
+          f"{len(manifest['figures'])} other) in {time.perf_counter() - start:.2f}s")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the deployment artifact bundle")
+    parser.add_argument("--campaigns", default=paths.input_path)
+    parser.add_argument("--members", default=paths.members_path)
+    parser.add_argument("--v2", default=paths.v2_path, help="v2 export used for the first-time total")
+    parser.add_argument("--out", default=None, help="bundle directory (default: ECA_BUNDLE_DIR or ./bundle)")
+    args = parser.parse_args()
+    missing = paths.missing_sources({'input': args.campaigns, 'members': args.members, 'v2': args.v2})
+    try:
+        scatter = scatter_figure()
+    except Exception as e:
+        print(f"WARNING: could not build the scatter from the Drive workbook: {str(e)}")
+        scatter = None
+    if not missing:
+        build_bundle(args.campaigns, args.members, args.v2, directory=args.out, scatter=scatter)
+    elif scatter is not None:
+        print("WARNING: source workbooks not found, bundling the scatter only: " + ", ".join(missing))
+        write_bundle(args.out or bundle_dir(), {}, {}, {}, scatter)
+    else:
+        print("ERROR: no bundle written; source workbooks not found (" + ", ".join(missing)
+              + ") and the Drive workbook could not be fetched")
+        sys.exit(1)
@@ -1,69 +1,277 @@
-import pandas as pd
+"""Generate synthetic campaign and member exports at any scale.
+
+The frames have the real export column names and follow the FY25 data's
+shape: the interaction type, site, audience and SDOH mixes; about 4.3
+campaign rows per parent campaign with a long tail; the "PARENT1: CEC - "
+style prefixes that name cleaning strips; and about two member rows per
+campaign row, 85% of them pointing at a campaign in the campaigns export.
+
+    python create_sample_data.py [--rows 1000] [--member-rows N] [--seed 0]
+                                 [--out data] [--format xlsx|csv|parquet]
+
+Excel sheets stop at 1,048,576 rows, so larger exports must be csv or
+parquet (the default format switches to parquet automatically).
+"""
+import argparse
+import os
+
 import numpy as np
-from datetime import datetime, timedelta
-
-# Create sample campaign data
-campaigns_data = {
-    'startdateandtime': [
-        '1/1/2024, 9:00 AM',
-        '1/2/2024, 10:00 AM',
-        '1/3/2024, 2:00 PM',
-        '1/4/2024, 3:00 PM',
-        '1/5/2024, 11:00 AM'
-    ],
-    'enddateandtime': [
-        '1/1/2024, 10:00 AM',
-        '1/2/2024, 11:00 AM',
-        '1/3/2024, 3:00 PM',
-        '1/4/2024, 4:00 PM',
-        '1/5/2024, 12:00 PM'
-    ],
-    'parentcampaignname': [
-        'Campaign A',
-        'Campaign A',
-        'Campaign B',
-        'Campaign B',
-        'Campaign C'
-    ],
-    'ecaactivitytype': [
-        'Meeting',
-        'Event',
-        'Meeting',
-        'Event',
-        'Meeting'
-    ],
-    'interactiontype': [
-        '1st Time Inquiry – Requested by Org or Group',
-        'Follow Up Project Planning or Problem-Solving Meeting',
-        '1st Time Outreach – Initiated by ECA Staff',
-        'Community Meeting',
-        'Reoccurring activity'
-    ]
+import pandas as pd
+
+EXCEL_MAX_ROWS = 1_048_575
+FY_START = pd.Timestamp('2024-07-01')
+
+SITES = {
+    'Homewood': 0.31, 'Campus-based': 0.205, 'Hazelwood': 0.175, 'Hill': 0.132, 'Oakland': 0.06,
+    'Anchor': 0.043, 'OLLI': 0.035, 'GNEP': 0.014, 'Volunteerism': 0.013,
+    'Response & Connection': 0.012, 'No Site': 0.001,
 }
 
-# Create sample members data
-members_data = {
-    'Parent Campaign: Campaign Name': [
-        'Campaign A',
-        'Campaign B',
-        'Campaign C'
-    ],
-    'Interaction Type': [
-        '1st Time Inquiry – Requested by Org or Group',
-        '1st Time Outreach – Initiated by ECA Staff',
-        'Reoccurring activity'
-    ],
-    'ECA Affiliation Name': [
-        'Affiliation 1',
-        'Affiliation 2',
-        'Affiliation 3'
-    ]
+INTERACTION_TYPES = {
+    None: 0.378,
+    'Follow Up Project Planning or Problem-Solving Meeting': 0.267,
+    'Reoccurring activity': 0.132,
+    '1st Time Inquiry – Requested by Org or Group': 0.079,
+    'Community Meeting': 0.039,
+    '1st Time Outreach – Initiated by ECA Staff': 0.039,
+    'Repeat – For Purposes of Ongoing Participation or to Rep ECA': 0.029,
+    'Stand alone activity': 0.018,
+    'Scheduling or Show-and-Tell Visit': 0.009,
+    'Other, such as Room Request': 0.007,
+    'Resident, Institutional or City Concern': 0.003,
+}
+
+ACTIVITY_TYPES = {'Meeting': 0.661, 'Event': 0.339}
+AUDIENCES = {'Resident': 0.349, 'Internal': 0.317, 'Organization': 0.282, 'Student': 0.045, None: 0.007}
+SDOH_CATEGORIES = {
+    None: 0.673, 'Social and Community Context': 0.092, 'Education Access and Quality': 0.083,
+    'Economic Stability': 0.055, 'Health Care': 0.043, 'Other': 0.028,
+    'Neighborhood and Built Environment': 0.026,
+}
+PARENT_PREFIXES = {
+    '': 0.53, 'PARENT1: CEC - ': 0.19, 'PARENT1: ': 0.10, 'PARENT 1: CEC - ': 0.09,
+    'PARENT 1: CEC ': 0.07, 'CEC - ': 0.02,
 }
+TOPICS = [
+    'Community Partnership', 'Youth Program', 'Health Fair', 'Workforce Pathways', 'Literacy Circle',
+    'Neighborhood Forum', 'STEM Outreach', 'Arts Collaborative', 'Housing Clinic', 'Food Access',
+    'Senior Learning', 'Small Business Hub', 'Civic Engagement', 'Digital Inclusion', 'Wellness Series',
+]
+STAFF = {
+    'Avery Collins': 0.227, 'Jordan Ellis': 0.124, 'Morgan Reyes': 0.113, 'Taylor Brooks': 0.091,
+    'Casey Nguyen': 0.077, 'Riley Patel': 0.06, 'Quinn Foster': 0.058, 'Drew Harper': 0.053,
+    'Jamie Lawson': 0.039, 'Parker Hayes': 0.035, 'Rowan Price': 0.033, 'Skyler Grant': 0.03,
+    'Emerson Cole': 0.025, 'Hayden Ross': 0.02, 'Sage Porter': 0.015,
+}
+SCHOOLS = [
+    ('School of Social Work', 'SSW'), ('School of Law', 'LAW'), ('School of Education', 'SOE'),
+    ('School of Medicine', 'SOM'), ('School of Nursing', 'SON'), ('School of Public Health', 'SPH'),
+    ('Swanson School of Engineering', 'SSOE'), ('Kenneth P. Dietrich School of Arts and Sciences', 'DSAS'),
+    ('Graduate School of Public and International Affairs', 'GSPIA'), ('College of Business Administration', 'CBA'),
+    ('School of Computing and Information', 'SCI'), ('School of Pharmacy', 'PHARM'),
+    ('School of Dental Medicine', 'DENT'), ('School of Health and Rehabilitation Sciences', 'SHRS'),
+    ('University Library System', 'ULS'), ('University Center for International Studies', 'UCIS'),
+    ('Office of Community and Governmental Relations', 'OCGR'), ('Student Affairs', 'SA'),
+    ('Athletics', 'ATH'), ('Honors College', 'HC'), ('College of General Studies', 'CGS'),
+    ('Office of the Provost', 'PROV'),
+]
+CONTACT_TYPES = [
+    'Community Member', 'Faculty', 'Staff', 'Student', 'Nonprofit', 'Government', 'Business',
+    'School', 'Faith-based', 'Funder', 'Alumni', 'Healthcare', 'Media', 'Elected Official', 'Other',
+]
+FIRST_NAMES = ['Alex', 'Sam', 'Chris', 'Pat', 'Dana', 'Lee', 'Robin', 'Terry', 'Jesse', 'Kim',
+               'Shawn', 'Devon', 'Corey', 'Reese', 'Kendall', 'Blair', 'Cameron', 'Elliot', 'Frankie', 'Harley']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Miller', 'Davis', 'Wilson', 'Moore', 'Clark',
+              'Lewis', 'Walker', 'Hall', 'Allen', 'Young', 'King', 'Wright', 'Scott', 'Green', 'Baker']
+
+CAMPAIGN_COLUMNS = [
+    'Unique', 'Site', 'Parent Campaign Name', 'Campaign Name', 'Created By', 'ECA Activity Type',
+    'Primary Audience', 'Interaction Type', 'SDOH Category', 'Start Date and Time', 'End Date and Time',
+    'Event Duration', 'Total Attendees',
+]
+MEMBER_COLUMNS = [
+    'Parent Campaign: Campaign Name', 'Campaign Name', 'School/Major Unit', 'School/Major Unit (Abbr)',
+    'Department', 'Created By: Full Name', 'Site', 'ECA Activity Type', 'Interaction Type',
+    'Primary Audience', 'SDOH Category', 'Primary Contact Type', 'Full Name', 'Email',
+    'ECA Affiliation Name', 'Start Date and Time',
+]
+
+# Start times run 8:00 AM - 6:00 PM in half hours; events end by 10:00 PM
+START_SLOTS = 21
+LAST_SLOT = 28
+
+
+def pick(rng, choices, size):
+    """Draw size values from a {value: weight} dict (or list, uniformly) as an object array"""
+    if isinstance(choices, dict):
+        values = np.array(list(choices), dtype=object)
+        weights = np.array(list(choices.values()), dtype=float)
+        return values[rng.choice(len(values), size=size, p=weights / weights.sum())]
+    values = np.array(choices, dtype=object)
+    return values[rng.integers(0, len(values), size)]
+
+
+def with_missing(rng, values, share):
+    values = values.astype(object)
+    values[rng.random(len(values)) < share] = None
+    return values
+
+
+def _slot_label(slot):
+    hour, minute = 8 + slot // 2, 30 * (slot % 2)
+    return f"{(hour - 1) % 12 + 1}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+def timestamp_strings(days, slots):
+    """"M/D/YYYY, H:MM AM" strings, built once per distinct (day, slot) and indexed"""
+    dates = FY_START + pd.to_timedelta(np.arange(365), unit='D')
+    labels = np.array([
+        f"{d.month}/{d.day}/{d.year}, {_slot_label(slot)}"
+        for d in dates for slot in range(LAST_SLOT + 1)
+    ], dtype=object)
+    return labels[days * (LAST_SLOT + 1) + slots]
+
+
+def parent_sizes(rng, rows):
+    """Rows per parent campaign: geometric with mean ~4, like the FY25 export"""
+    sizes = rng.geometric(0.24, size=rows // 4 + 1)
+    while sizes.sum() < rows:
+        sizes = np.concatenate([sizes, rng.geometric(0.24, size=rows // 4 + 1)])
+    cut = np.searchsorted(np.cumsum(sizes), rows)
+    sizes = sizes[:cut + 1].copy()
+    sizes[-1] -= sizes.sum() - rows
+    return sizes
+
+
+def generate_campaigns(rows, seed=0):
+    """A raw campaigns export with rows rows"""
+    rng = np.random.default_rng(seed)
+    sizes = parent_sizes(rng, rows)
+    parents = len(sizes)
+
+    bases = np.array([f"{TOPICS[i % len(TOPICS)]} {i + 1}" for i in range(parents)], dtype=object)
+    parent_names = pick(rng, PARENT_PREFIXES, parents) + bases
+    parent_sites = pick(rng, SITES, parents)
+
+    parent_of_row = np.repeat(np.arange(parents), sizes)
+    session = np.arange(rows) - np.repeat(np.cumsum(sizes) - sizes, sizes) + 1
+    order = rng.permutation(rows)
+    parent_of_row, session = parent_of_row[order], session[order]
+
+    days = rng.integers(0, 365, rows)
+    start_slot = rng.integers(0, START_SLOTS, rows)
+    length = np.minimum(rng.geometric(0.45, rows), LAST_SLOT - start_slot)
+    starts = timestamp_strings(days, start_slot)
+
+    campaign_names = np.array([
+        f"{base} Session {k}" for base, k in zip(bases[parent_of_row], session)
+    ], dtype=object)
+
+    return pd.DataFrame({
+        'Unique': campaign_names + '###' + starts,
+        'Site': parent_sites[parent_of_row],
+        'Parent Campaign Name': parent_names[parent_of_row],
+        'Campaign Name': campaign_names,
+        'Created By': pick(rng, STAFF, rows),
+        'ECA Activity Type': pick(rng, ACTIVITY_TYPES, rows),
+        'Primary Audience': pick(rng, AUDIENCES, rows),
+        'Interaction Type': pick(rng, INTERACTION_TYPES, rows),
+        'SDOH Category': pick(rng, SDOH_CATEGORIES, rows),
+        'Start Date and Time': starts,
+        'End Date and Time': timestamp_strings(days, start_slot + length),
+        'Event Duration': length * 0.5,
+        'Total Attendees': rng.poisson(1.45, rows),
+    }, columns=CAMPAIGN_COLUMNS)
+
+
+def generate_members(campaigns, rows, seed=0):
+    """A raw members export whose rows mostly point at rows of campaigns"""
+    rng = np.random.default_rng(seed + 1)
+    source = campaigns.iloc[rng.integers(0, len(campaigns), rows)].reset_index(drop=True)
+    orphan = rng.random(rows) < 0.15
+
+    parent = source['Parent Campaign Name'].to_numpy(dtype=object).copy()
+    parent[orphan] = 'No Parent Campaign'
+    interaction = source['Interaction Type'].to_numpy(dtype=object).copy()
+    interaction[(rng.random(rows) < 0.06) & pd.isna(interaction)] = 'No Interaction Type'
+
+    schools = rng.integers(0, len(SCHOOLS), rows)
+    has_school = rng.random(rows) >= 0.498
+    school = np.array([name for name, _ in SCHOOLS], dtype=object)[schools]
+    abbr = np.array([code for _, code in SCHOOLS], dtype=object)[schools]
+    departments = np.array([f"Department of {TOPICS[i % len(TOPICS)]} {i + 1}" for i in range(183)], dtype=object)
+
+    people = max(10, rows // 3)
+    person = rng.integers(0, people, rows)
+    first = np.array(FIRST_NAMES, dtype=object)[person % len(FIRST_NAMES)]
+    last = np.array(LAST_NAMES, dtype=object)[(person // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    suffix = (person // (len(FIRST_NAMES) * len(LAST_NAMES))).astype(str).astype(object)
+    suffix[person < len(FIRST_NAMES) * len(LAST_NAMES)] = ''
+    full_name = first + ' ' + last + suffix
+    email = np.char.lower((first + '.' + last + suffix + '@pitt.edu').astype(str)).astype(object)
+    named = rng.random(rows) >= 0.22
+    affiliations = np.array([
+        f"{TOPICS[i % len(TOPICS)]} Alliance {i + 1}" for i in range(max(5, rows // 16))
+    ], dtype=object)
+
+    members = pd.DataFrame({
+        'Parent Campaign: Campaign Name': parent,
+        'Campaign Name': source['Campaign Name'].to_numpy(dtype=object),
+        'School/Major Unit': np.where(has_school, school, None),
+        'School/Major Unit (Abbr)': np.where(has_school, abbr, None),
+        'Department': np.where(has_school, pick(rng, departments, rows), None),
+        'Created By: Full Name': source['Created By'].to_numpy(dtype=object),
+        'Site': source['Site'].to_numpy(dtype=object),
+        'ECA Activity Type': source['ECA Activity Type'].to_numpy(dtype=object),
+        'Interaction Type': interaction,
+        'Primary Audience': source['Primary Audience'].to_numpy(dtype=object),
+        'SDOH Category': source['SDOH Category'].to_numpy(dtype=object),
+        'Primary Contact Type': with_missing(rng, pick(rng, CONTACT_TYPES, rows), 0.491),
+        'Full Name': np.where(named, full_name, None),
+        'Email': np.where(named & (rng.random(rows) >= 0.065), email, None),
+        'ECA Affiliation Name': with_missing(rng, pick(rng, affiliations, rows), 0.779),
+        'Start Date and Time': source['Start Date and Time'].to_numpy(dtype=object),
+    }, columns=MEMBER_COLUMNS)
+    return members
+
+
+def write_frame(frame, path, fmt):
+    if fmt == 'xlsx':
+        if len(frame) > EXCEL_MAX_ROWS:
+            raise ValueError(f"{len(frame)} rows do not fit in one Excel sheet; use csv or parquet")
+        from exports import write_xlsx
+        write_xlsx(path, frame, 10_000)
+    elif fmt == 'csv':
+        frame.to_csv(path, index=False)
+    elif fmt == 'parquet':
+        frame.to_parquet(path, index=False)
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+
+def write_exports(rows, out_dir, member_rows=None, seed=0, fmt=None):
+    """Generate both exports and write them under the names the scripts read"""
+    member_rows = member_rows if member_rows is not None else 2 * rows
+    fmt = fmt or ('xlsx' if max(rows, member_rows) <= EXCEL_MAX_ROWS else 'parquet')
+    campaigns = generate_campaigns(rows, seed)
+    members = generate_members(campaigns, member_rows, seed)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = (
+        os.path.join(out_dir, f"ECA Campaigns_FY25_ALL_v2.{fmt}"),
+        os.path.join(out_dir, f"ECA Campaign Members_FY25_ALL.{fmt}"),
+    )
+    write_frame(campaigns, paths[0], fmt)
+    write_frame(members, paths[1], fmt)
+    return paths
 
-# Create DataFrames
-campaigns_df = pd.DataFrame(campaigns_data)
-members_df = pd.DataFrame(members_data)
 
-# Save to Excel files in the data directory
-campaigns_df.to_excel('data/ECA Campaigns_FY25_ALL_v2.xlsx', index=False)
-members_df.to_excel('data/ECA Campaign Members_FY25_ALL.xlsx', index=False)
\ No newline at end of file
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate synthetic campaign and member exports")
+    parser.add_argument('--rows', type=int, default=1000, help="campaign rows")
+    parser.add_argument('--member-rows', type=int, default=None, help="member rows (default: 2 x rows)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='data')
+    parser.add_argument('--format', choices=['xlsx', 'csv', 'parquet'], default=None)
+    args = parser.parse_args()
+    for path in write_exports(args.rows, args.out, args.member_rows, args.seed, args.format):
+        print(f"Wrote {path}")
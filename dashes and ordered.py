@@ -13,6 +13,10 @@ from dash import html, dcc
 from dash.dependencies import Input, Output
 import dash_bootstrap_components as dbc
 
+from exports import export_outputs
+from pipeline import add_flags, add_interaction_type_flags
+from sources import SourceRegistry
+
 # ORDERS 1ST TIME AND REMOVES DASHES AND PARENT CEC 
 
 
@@ -23,8 +27,9 @@ output_path = r"C:\Users\eilam\OneDrive\CEC\ECA Campaigns_FY25_BINARY.xlsx"
 # Define Stata's epoch
 STATA_EPOCH = pd.Timestamp('1960-01-01')
 
-# Load data
-df = pd.read_excel(input_path)
+# Load data (the registry parses each workbook once, however many times it is read)
+sources = SourceRegistry()
+df = sources.read(input_path)
 
 # Convert column names to lowercase and fix spaces
 df.columns = df.columns.str.lower().str.replace(' ', '')
@@ -49,45 +54,28 @@ df['parents_id'] = df['parentcampaignname'].astype('category').cat.codes
 df.sort_values(by=['parentcampaignname', 'num_startdate'], inplace=True)
 df['num_campaigns'] = df.groupby('parentcampaignname').cumcount() + 1
 
-# Create binary columns for activity types
-df['meeting'] = (df['ecaactivitytype'] == 'Meeting').astype(int)
-df['event'] = (df['ecaactivitytype'] == 'Event').astype(int)
-
-# Create binary columns for interaction types
-df['firsttime'] = ((df['interactiontype'] == "1st Time Inquiry – Requested by Org or Group") | 
-                   (df['interactiontype'] == "1st Time Outreach – Initiated by ECA Staff")).astype(int)
-df['frst_inquiry'] = (df['interactiontype'] == "1st Time Inquiry – Requested by Org or Group").astype(int)
-df['frst_outreach'] = (df['interactiontype'] == "1st Time Outreach – Initiated by ECA Staff").astype(int)
-df['followup_mtg'] = (df['interactiontype'] == "Follow Up Project Planning or Problem-Solving Meeting").astype(int)
-df['reoccurring'] = (df['interactiontype'] == "Reoccurring activity").astype(int)
-df['repeat'] = (df['interactiontype'] == "Repeat – For Purposes of Ongoing Participation or to Rep ECA").astype(int)
-df['community_mtg'] = (df['interactiontype'] == "Community Meeting").astype(int)
-df['standalone'] = (df['interactiontype'] == "Stand alone activity").astype(int)
-df['scheduling'] = (df['interactiontype'] == "Scheduling or Show-and-Tell Visit").astype(int)
-df['concerns'] = (df['interactiontype'] == "Resident, Institutional or City Concern").astype(int)
-df['other'] = (df['interactiontype'] == "Other, such as Room Request").astype(int)
+# Create binary (uint8) columns for activity and interaction types in one pass
+df = add_flags(df)
 
 # Read the members file
 members_path = r"C:\Users\eilam\OneDrive\CEC\ECA Campaign Members_FY25_ALL.xlsx"
-members_df = pd.read_excel(members_path)
+members_df = sources.read(members_path)
 
 # Filter members file for first-time interactions
 members_filtered = members_df[
     (members_df['Interaction Type'] == "1st Time Inquiry – Requested by Org or Group") | 
     (members_df['Interaction Type'] == "1st Time Outreach – Initiated by ECA Staff")
 ]
-members_filtered.to_excel(r"C:\Users\eilam\OneDrive\CEC\ECA Campaign Members_FY25_members_filtered.xlsx", index=False)
 
 # Get unique parent campaigns with first-time interactions
 unique_parent_campaigns = members_filtered['Parent Campaign: Campaign Name'].unique()
 
 # Filter the original dataframe to include only interactions for these parent campaigns
-df_filtered = df[df['parentcampaignname'].isin(unique_parent_campaigns)]
+df_filtered = df[df['parentcampaignname'].isin(unique_parent_campaigns)].copy()
 
 # Create binary columns for each interaction type for summing purposes
 interaction_types = df['interactiontype'].dropna().unique()
-for interaction in interaction_types:
-    df_filtered.loc[:, interaction.lower().replace(' ', '_').replace('–', '').replace('(', '').replace(')', '')] = (df_filtered['interactiontype'] == interaction).astype(int)
+df_filtered = add_interaction_type_flags(df_filtered, interaction_types)
 
 # Create a total column for the number of interactions each parent campaign has
 df_filtered['total_interactions'] = df_filtered.groupby('parentcampaignname')['interactiontype'].transform('count')
@@ -95,42 +83,46 @@ df_filtered['total_interactions'] = df_filtered.groupby('parentcampaignname')['i
 # Calculate days from first-time interaction
 df_filtered['days_from_first'] = df_filtered.groupby('parentcampaignname')['num_startdate'].transform(lambda x: x - x.min())
 
-# Save the filtered dataframe to a new Excel file
-df_filtered.to_excel(r"C:\Users\eilam\OneDrive\CEC\ECA Campaigns_FY25_filtered_interactions.xlsx", index=False)
-
-# Save the binary data
-try:
-    df.to_excel(output_path, index=False)
-except PermissionError:
-    print("Please close any Excel applications that might be using the file and try again.")
-    exit()
-
 # Filter v2 file for first-time interactions
 v2_path = r"C:\Users\eilam\OneDrive\CEC\ECA Campaigns_FY25_ALL_v2.xlsx"
-v2_df = pd.read_excel(v2_path)
+v2_df = sources.read(v2_path)  # same workbook as input_path: served from the first parse
 filtered_first_time = v2_df[
     (v2_df['Interaction Type'] == "1st Time Inquiry – Requested by Org or Group") | 
     (v2_df['Interaction Type'] == "1st Time Outreach – Initiated by ECA Staff")
 ]
-filtered_first_time.to_excel(r"C:\Users\eilam\OneDrive\CEC\ECA Campaigns_FY25_filtered_first_time.xlsx", index=False)
+
+# Save the ordered outputs next to the BINARY workbook, under their original names
+saved = export_outputs({
+    'binary': df,
+    'filtered_interactions': df_filtered,
+    'members_filtered': members_filtered,
+    'filtered_first_time': filtered_first_time,
+}, os.path.dirname(output_path), "ECA Campaigns_FY25_outputs", paths={
+    'binary': os.path.splitext(output_path)[0],
+    'filtered_interactions': r"C:\Users\eilam\OneDrive\CEC\ECA Campaigns_FY25_filtered_interactions",
+    'members_filtered': r"C:\Users\eilam\OneDrive\CEC\ECA Campaign Members_FY25_members_filtered",
+    'filtered_first_time': r"C:\Users\eilam\OneDrive\CEC\ECA Campaigns_FY25_filtered_first_time",
+})
 
 # Print summary once at the end
 print("\nFiles created:")
 print(f"1. Binary indicators file")
-print(f"   - Saved to: {output_path}")
+print(f"   - Saved to: {saved['binary']}")
 print(f"   - Contains all interactions with binary columns")
 
 print(f"\n2. Filtered first-time interactions from v2 file")
 print(f"   - Contains {len(filtered_first_time)} interactions")
-print(f"   - Saved to: ECA Campaigns_FY25_filtered_first_time.xlsx")
+print(f"   - Saved to: {saved['filtered_first_time']}")
 
 print(f"\n3. Filtered first-time interactions from members file")
 print(f"   - Contains {len(members_filtered)} interactions")
-print(f"   - Saved to: ECA Campaign Members_FY25_members_filtered.xlsx")
+print(f"   - Saved to: {saved['members_filtered']}")
 
 print(f"\n4. Filtered interactions for parent campaigns with first-time interactions")
 print(f"   - Contains {len(df_filtered)} interactions")
-print(f"   - Saved to: ECA Campaigns_FY25_filtered_interactions.xlsx")
+print(f"   - Saved to: {saved['filtered_interactions']}")
+
+sources.report()
 
 # Calculate statistics from correct sources
 v2_first_time_total = len(filtered_first_time)  # From v2 file
@@ -0,0 +1,215 @@
+"""Fetch the campaign workbook from Google Drive (or any HTTP URL).
+
+Every download goes through one pooled requests.Session with timeouts. The
+body is kept in a cache directory (default /tmp/eca_fetch, ECA_FETCH_CACHE)
+with a small JSON sidecar holding its SHA-256, ETag and Last-Modified. A
+cached copy whose checksum still matches is revalidated with a conditional
+GET, so an unchanged file costs a 304 and no body. Concurrent callers asking
+for the same URL share one in-flight request (single-flight), and the parsed
+DataFrame is memoized per checksum, so a 304 also skips the Excel parse.
+
+ECA_DRIVE_URL overrides the Drive URL, e.g. to point at a local server.
+"""
+import hashlib
+import json
+import os
+import threading
+from io import BytesIO
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+DRIVE_FILE_ID = '18Uz_n4Jp1EtXvCnQhqdGDFn1H7clLMyt'
+DEFAULT_CACHE_DIR = os.path.join("/tmp", "eca_fetch")
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (5, 60)
+
+
+def drive_url(file_id=DRIVE_FILE_ID):
+    return f"https://drive.google.com/uc?export=download&id={file_id}"
+
+
+def default_url():
+    return os.environ.get("ECA_DRIVE_URL", drive_url())
+
+
+def fetch_cache_dir():
+    return os.environ.get("ECA_FETCH_CACHE", DEFAULT_CACHE_DIR)
+
+
+def make_session(pool_size=4):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Fetcher:
+    """Conditional, cached, single-flight downloads over one pooled session"""
+
+    def __init__(self, cache_dir=None, session=None, timeout=DEFAULT_TIMEOUT):
+        self.cache_dir = cache_dir or fetch_cache_dir()
+        self.session = session or make_session()
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._parsed = {}
+        self.stats = {'downloads': 0, 'not_modified': 0, 'coalesced': 0, 'stale_served': 0, 'parses': 0}
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode()).hexdigest()[:24]
+        return os.path.join(self.cache_dir, key + ".bin"), os.path.join(self.cache_dir, key + ".json")
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def cached(self, url):
+        """Sidecar metadata of the cached copy, or None when it is missing or fails its checksum"""
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path) as fh:
+                meta = json.load(fh)
+            if file_sha256(body_path) == meta.get("sha256"):
+                return meta
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _download(self, url):
+        body_path, meta_path = self._paths(url)
+        meta = self.cached(url)
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+            try:
+                if response.status_code == 304 and meta:
+                    self._count('not_modified')
+                    return body_path, meta["sha256"]
+                response.raise_for_status()
+
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = body_path + ".tmp-%d-%d" % (os.getpid(), threading.get_ident())
+                digest = hashlib.sha256()
+                try:
+                    with open(tmp_path, "wb") as fh:
+                        for chunk in response.iter_content(1 << 20):
+                            digest.update(chunk)
+                            fh.write(chunk)
+                    os.replace(tmp_path, body_path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+            finally:
+                response.close()
+        except requests.RequestException as e:
+            if meta is None:
+                raise
+            # Drive is down or slow: the last good copy beats no dashboard
+            print(f"Error fetching {url}, serving cached copy: {str(e)}")
+            self._count('stale_served')
+            return body_path, meta["sha256"]
+
+        meta = {
+            "url": url,
+            "sha256": digest.hexdigest(),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        # Sidecar last: a body without a matching sidecar is simply re-downloaded
+        with open(meta_path + ".tmp", "w") as fh:
+            json.dump(meta, fh)
+        os.replace(meta_path + ".tmp", meta_path)
+        self._count('downloads')
+        return body_path, meta["sha256"]
+
+    def _single_flight(self, key, work):
+        """Run work() once for concurrent callers with the same key; all of them get its result"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.stats['coalesced'] += 1
+        if leader:
+            try:
+                flight.result = work()
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def fetch(self, url=None):
+        """Return (path, sha256) of an up-to-date local copy of url"""
+        url = url or default_url()
+        return self._single_flight(('fetch', url), lambda: self._download(url))
+
+    def _parse(self, url):
+        path, sha = self.fetch(url)
+        frame = self._parsed.get(sha)
+        if frame is None:
+            with open(path, "rb") as fh:
+                frame = pd.read_excel(BytesIO(fh.read()))
+            self._count('parses')
+            # Only the latest content is worth keeping
+            self._parsed = {sha: frame}
+        return frame
+
+    def read_excel(self, url=None):
+        """The workbook at url as a DataFrame, parsed once per distinct content"""
+        url = url or default_url()
+        return self._single_flight(('excel', url), lambda: self._parse(url)).copy(deep=False)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_fetcher():
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Fetcher()
+        return _default
+
+
+def fetch_excel(url=None):
+    return default_fetcher().read_excel(url)
+
+
+def fetch_campaigns(url=None):
+    """The workbook with the column names the Drive-backed apps use (lower case, no spaces)"""
+    df = fetch_excel(url)
+    df.columns = df.columns.str.lower().str.replace(' ', '')
+    return df
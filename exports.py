@@ -0,0 +1,237 @@
+"""Export stage for the processing scripts' outputs.
+
+All outputs are written in one pass, in one of four formats chosen with
+ECA_EXPORT_FORMAT (or the fmt argument):
+
+    xlsx       one constant_memory .xlsx per output, written by xlsxwriter
+               (default; the scripts keep their original file names)
+    workbook   one .xlsx with a sheet per output
+    csv        one .csv per output
+    parquet    one .parquet per output
+
+Per-output files go to paths[name] plus the format's extension, or to
+<directory>/<stem>_<name> without paths; the workbook is <directory>/<stem>.xlsx.
+Rows are converted and written ECA_EXPORT_CHUNK_ROWS at a time, so memory
+stays bounded by one chunk rather than by a whole serialized sheet. Each
+export prints its rows, bytes and throughput.
+
+Per-output files are written concurrently by ECA_EXPORT_WORKERS workers.
+The xlsx writer is pure Python and holds the GIL, so xlsx uses a process
+pool by default wherever processes can be forked. csv and parquet use a
+thread pool, and so does xlsx where fork is unavailable, because the
+scripts are not import-safe for spawned processes. ECA_EXPORT_POOL=thread
+or ECA_EXPORT_POOL=process overrides the default. Forked workers inherit
+the frames from the parent, so only an output's name is sent to them and
+no frame is pickled. Every file is written to a temporary sibling and
+renamed over the target only once complete, so a failed or locked write
+never replaces a good file, and one output failing does not stop the others.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+EXPORT_FORMATS = ('xlsx', 'workbook', 'csv', 'parquet')
+POOL_KINDS = ('thread', 'process')
+DEFAULT_CHUNK_ROWS = 10_000
+DEFAULT_WORKERS = 4
+# A target held open by Excel refuses the rename; give it a moment before giving up
+RENAME_ATTEMPTS = 3
+RENAME_WAIT = 0.5
+# Excel's limit on sheet name length
+MAX_SHEET_NAME = 31
+
+# Payloads by job name for forked workers; filled before the pool forks them
+_fork_payloads = {}
+
+
+def export_format(fmt=None):
+    fmt = fmt or os.environ.get('ECA_EXPORT_FORMAT', 'xlsx')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return fmt
+
+
+def chunk_rows(rows=None):
+    return rows or int(os.environ.get('ECA_EXPORT_CHUNK_ROWS', DEFAULT_CHUNK_ROWS))
+
+
+def export_workers(workers=None):
+    return max(1, workers or int(os.environ.get('ECA_EXPORT_WORKERS', DEFAULT_WORKERS)))
+
+
+def can_fork():
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+def pool_kind(kind=None, fmt=None):
+    default = 'process' if fmt == 'xlsx' and can_fork() else 'thread'
+    kind = kind or os.environ.get('ECA_EXPORT_POOL', default)
+    if kind not in POOL_KINDS:
+        raise ValueError(f"Unknown export pool: {kind}")
+    return kind
+
+
+def iter_row_blocks(frame, rows):
+    """Lists of plain Python rows, rows at a time, with every kind of missing value as None"""
+    for start in range(0, len(frame), rows):
+        block = frame.iloc[start:start + rows].astype(object)
+        yield block.where(block.notna(), None).values.tolist()
+
+
+def write_workbook(path, outputs, rows):
+    import xlsxwriter
+
+    # constant_memory flushes each row as soon as the next one starts
+    workbook = xlsxwriter.Workbook(path, {
+        'constant_memory': True,
+        'strings_to_formulas': False,
+        'strings_to_urls': False,
+        'remove_timezone': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+    })
+    try:
+        for name, frame in outputs.items():
+            sheet = workbook.add_worksheet(name[:MAX_SHEET_NAME])
+            sheet.write_row(0, 0, [str(col) for col in frame.columns])
+            row_number = 1
+            for block in iter_row_blocks(frame, rows):
+                for values in block:
+                    sheet.write_row(row_number, 0, values)
+                    row_number += 1
+    finally:
+        workbook.close()
+
+
+def write_xlsx(path, frame, rows):
+    write_workbook(path, {'Sheet1': frame}, rows)
+
+
+def write_csv(path, frame, rows):
+    frame.to_csv(path, index=False, chunksize=rows)
+
+
+def write_parquet(path, frame, rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    with pq.ParquetWriter(path, schema) as writer:
+        for start in range(0, len(frame), rows):
+            chunk = frame.iloc[start:start + rows]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+WRITERS = {'workbook': write_workbook, 'xlsx': write_xlsx, 'csv': write_csv, 'parquet': write_parquet}
+
+
+def sibling_path(directory, stem, name, fmt):
+    return os.path.join(directory, f"{stem}_{name}.{fmt}")
+
+
+def replace_when_free(tmp_path, path):
+    for attempt in range(RENAME_ATTEMPTS):
+        try:
+            os.replace(tmp_path, path)
+            return
+        except PermissionError:
+            if attempt == RENAME_ATTEMPTS - 1:
+                raise
+            time.sleep(RENAME_WAIT)
+
+
+def write_output(fmt, name, path, payload, rows):
+    """Write one file to a temporary sibling, then rename it over path"""
+    start = time.perf_counter()
+    directory, filename = os.path.split(path)
+    tmp_path = os.path.join(directory, f".{filename}.tmp-{os.getpid()}-{threading.get_ident()}")
+    try:
+        WRITERS[fmt](tmp_path, payload, rows)
+        replace_when_free(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    total_rows = sum(len(frame) for frame in payload.values()) if fmt == 'workbook' else len(payload)
+    return _result(name, path, total_rows, start)
+
+
+def write_forked_output(fmt, name, path, rows):
+    """write_output in a forked worker, for a payload it inherited rather than received"""
+    return write_output(fmt, name, path, _fork_payloads[name], rows)
+
+
+def export_outputs(outputs, directory, stem, fmt=None, rows=None, workers=None, pool=None, paths=None):
+    """Write every output (name -> DataFrame); return name -> where it was saved (or why not)
+
+    paths optionally maps output names to target paths without an extension.
+    """
+    fmt = export_format(fmt)
+    rows = chunk_rows(rows)
+    if fmt == 'workbook':
+        path = os.path.join(directory, stem + ".xlsx")
+        jobs = [(', '.join(outputs), path, outputs)]
+        targets = {name: (jobs[0][0], f"{path} [sheet {name[:MAX_SHEET_NAME]}]") for name in outputs}
+    else:
+        paths = paths or {}
+        jobs = [(name, f"{paths[name]}.{fmt}" if name in paths else sibling_path(directory, stem, name, fmt), frame)
+                for name, frame in outputs.items()]
+        targets = {name: (name, path) for name, path, _ in jobs}
+    workers = min(export_workers(workers), len(jobs))
+    kind = pool_kind(pool, fmt)
+
+    start = time.perf_counter()
+    results, failures = [], {}
+    forked = kind == 'process' and workers > 1 and can_fork()
+    if forked:
+        # Forked workers never re-run the calling script (which is not import-safe), and they
+        # inherit _fork_payloads, which stays filled until the pool has shut down
+        _fork_payloads.update((name, payload) for name, _, payload in jobs)
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+    elif kind == 'process' and workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        with executor as executor_pool:
+            if forked:
+                futures = {executor_pool.submit(write_forked_output, fmt, name, path, rows): (name, path)
+                           for name, path, _ in jobs}
+            else:
+                futures = {executor_pool.submit(write_output, fmt, name, path, payload, rows): (name, path)
+                           for name, path, payload in jobs}
+            for future in as_completed(futures):
+                name, path = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    failures[name] = e
+                    print(f"Error exporting {name} to {path}: {str(e)}")
+                    if isinstance(e, PermissionError):
+                        print("Please close any Excel applications that might be using the file and try again.")
+    finally:
+        _fork_payloads.clear()
+    wall = time.perf_counter() - start
+
+    report(results)
+    print(f"Export took {wall:.2f}s with {workers} {kind} worker(s) "
+          f"(writers alone: {sum(result['seconds'] for result in results):.2f}s); "
+          f"{len(results)} written, {len(failures)} failed")
+    saved = {}
+    for name, (job, location) in targets.items():
+        error = failures.get(job)
+        saved[name] = location if error is None else f"NOT SAVED ({type(error).__name__}: {error})"
+    return saved
+
+
+def _result(name, path, rows, start):
+    seconds = time.perf_counter() - start
+    return {'name': name, 'path': path, 'rows': rows, 'bytes': os.path.getsize(path), 'seconds': seconds}
+
+
+def report(results):
+    for result in results:
+        seconds = max(result['seconds'], 1e-9)
+        print(f"Exported {result['name']}: {result['rows']} rows, {result['bytes'] / 1e6:.2f} MB "
+              f"in {result['seconds']:.2f}s ({result['rows'] / seconds:,.0f} rows/s, "
+              f"{result['bytes'] / 1e6 / seconds:.2f} MB/s) -> {result['path']}")
@@ -0,0 +1,171 @@
+"""On-disk Parquet cache for the processed dashboard frames.
+
+A cache entry is valid when every source file still has the same resolved
+path and size, and either the same mtime or (if the file was touched) the
+same SHA-256 content hash, and CACHE_VERSION has not changed. Anything else
+rebuilds the entry. Set ECA_REBUILD_CACHE=1 (or pass rebuild=True, or run
+`python frame_cache.py --rebuild`) to force a rebuild.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+import pandas as pd
+
+from metrics import timed
+
+# Bump this whenever the processing pipeline changes what it produces
+CACHE_VERSION = 6
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, ".eca_cache")
+MANIFEST_NAME = "manifest.json"
+
+
+def cache_dir():
+    return os.environ.get("ECA_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+
+def rebuild_requested():
+    return os.environ.get("ECA_REBUILD_CACHE", "").lower() in ("1", "true", "yes")
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(path):
+    """Path, size, mtime and content hash of one source file"""
+    path = os.path.realpath(path)
+    st = os.stat(path)
+    return {
+        "path": path,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": file_hash(path),
+    }
+
+
+def version_of(fingerprints):
+    """Short content-derived id for a set of source fingerprints"""
+    digest = hashlib.sha256()
+    for name in sorted(fingerprints):
+        digest.update(name.encode())
+        digest.update(fingerprints[name]["sha256"].encode())
+    return digest.hexdigest()[:16]
+
+
+def _source_unchanged(stored, path):
+    path = os.path.realpath(path)
+    if stored.get("path") != path or not os.path.exists(path):
+        return False
+    st = os.stat(path)
+    if st.st_size != stored.get("size"):
+        return False
+    if st.st_mtime_ns == stored.get("mtime_ns"):
+        return True
+    # mtime moved (copy, touch, re-download): fall back to the content hash
+    return file_hash(path) == stored.get("sha256")
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def is_valid(manifest, sources):
+    if not manifest or manifest.get("version") != CACHE_VERSION:
+        return False
+    stored = manifest.get("sources", {})
+    if set(stored) != set(sources):
+        return False
+    return all(_source_unchanged(stored[name], path) for name, path in sources.items())
+
+
+@timed(name='cache_load')
+def load(directory, manifest):
+    frames = {
+        name: pd.read_parquet(os.path.join(directory, filename))
+        for name, filename in manifest["frames"].items()
+    }
+    return frames, manifest.get("stats", {})
+
+
+@timed(name='cache_save')
+def save(directory, fingerprints, frames, stats):
+    """Write frames + manifest; the manifest is written last so a partial write never validates"""
+    tmp_dir = directory + ".tmp-%d" % os.getpid()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        frame_files = {}
+        for name, frame in frames.items():
+            filename = name + ".parquet"
+            frame.to_parquet(os.path.join(tmp_dir, filename))
+            frame_files[name] = filename
+        manifest = {
+            "version": CACHE_VERSION,
+            "created": time.time(),
+            "sources": fingerprints,
+            "frames": frame_files,
+            "stats": stats,
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), "w") as fh:
+            json.dump(manifest, fh, indent=2)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return manifest
+
+
+def load_or_build(sources, build, directory=None, rebuild=False):
+    """Return (frames, stats) from the cache, or call build() and cache its result
+
+    sources maps a logical name to a file path; build takes no arguments and
+    returns (frames, stats) where frames is a dict of DataFrames. stats gains a
+    'data_version' key that changes whenever any source's content changes.
+    """
+    directory = directory or cache_dir()
+    rebuild = rebuild or rebuild_requested()
+    if not rebuild:
+        manifest = _read_manifest(directory)
+        if is_valid(manifest, sources):
+            try:
+                start = time.perf_counter()
+                frames, stats = load(directory, manifest)
+                print(f"Loaded cached frames from {directory} in {time.perf_counter() - start:.3f}s")
+                return frames, stats
+            except Exception as e:
+                print(f"Cache read failed, rebuilding: {str(e)}")
+
+    # Fingerprint before building: a workbook saved mid-build then fails the next check
+    # instead of having stale frames cached under its new fingerprint
+    fingerprints = {name: fingerprint(path) for name, path in sources.items()}
+    frames, stats = build()
+    stats = dict(stats, data_version=version_of(fingerprints))
+    try:
+        save(directory, fingerprints, frames, stats)
+    except Exception as e:
+        # A read-only filesystem or an unserialisable column should never stop the app
+        print(f"Could not write frame cache to {directory}: {str(e)}")
+    return frames, stats
+
+
+if __name__ == "__main__":
+    # python frame_cache.py [--rebuild] warms (or rebuilds) the cache used by website.py
+    if "--rebuild" in sys.argv:
+        os.environ["ECA_REBUILD_CACHE"] = "1"
+    os.environ.setdefault("ECA_WARMUP", "0")
+    import website
+    website.get_data()
@@ -0,0 +1,65 @@
+"""gunicorn settings for running the dashboard (website.py) or the Drive app (app.py) in production.
+
+    gunicorn -c gunicorn.conf.py                          # website:application
+    gunicorn -c gunicorn.conf.py 'app:create_server()'    # app.py
+
+preload_app imports the app in the master, and when_ready then loads and
+processes its data there before any worker is forked. For website.py that
+covers the frames, member index, campaign counts, every site's timeline
+figure and the clientside timeline columns. For app.py it is the Drive
+snapshot. The workers share those pages copy-on-write instead of each
+parsing the workbooks. gc.freeze() moves the loaded objects out of the
+collector's generations, so a collection in a worker does not write to
+(and so copy) every page that holds them. A worker that gunicorn restarts
+shares the same pages.
+
+ECA_WORKERS (CPU count) sets the workers, and ECA_THREADS (4) sets each
+one's gthread pool. ECA_HOST (0.0.0.0) and PORT or ECA_PORT (8050) set the
+bind address.
+
+Memory per worker (3 workers x 4 threads after 200 concurrent timeline and
+layout requests, private memory from /proc/<pid>/smaps_rollup):
+with the FY25 exports (~600 campaign rows) the master is about 185 MB
+resident and each worker adds about 23 MB. With a 100,000-row synthetic
+export (create_sample_data.py --rows 100000) the master is about 530 MB
+and each worker adds about 30 MB. Without the preload, every worker would
+load and hold its own master-sized copy.
+
+Data a worker loads after the fork is its own. For example, app.py's Drive
+snapshot is refreshed in each worker after ECA_DATA_TTL, so the first
+refresh leaves every worker with a private copy.
+"""
+import gc
+import os
+import sys
+
+# The master loads synchronously in when_ready: a warm-up thread would not survive the fork
+os.environ['ECA_WARMUP'] = '0'
+
+wsgi_app = 'website:application'
+preload_app = True
+worker_class = 'gthread'
+workers = int(os.environ.get('ECA_WORKERS', os.cpu_count() or 1))
+threads = int(os.environ.get('ECA_THREADS', 4))
+bind = f"{os.environ.get('ECA_HOST', '0.0.0.0')}:{os.environ.get('PORT', os.environ.get('ECA_PORT', 8050))}"
+
+
+def when_ready(server):
+    """Runs in the master once the app is imported and before the first fork"""
+    website = sys.modules.get('website')
+    if website is not None:
+        thread = website.warm_up()
+        if thread is not None:
+            thread.join()
+        website.client_timeline_columns(website.get_data())
+    app = sys.modules.get('app')
+    if app is not None:
+        app.load_data()
+
+    # plotly imports orjson on its first figure; do it here rather than racing it in each worker's threads
+    from _plotly_utils.optional_imports import get_module
+    get_module('orjson')
+
+    gc.collect()
+    gc.freeze()
+    server.log.info("Data loaded in the master; forking %s workers x %s threads", workers, threads)
@@ -0,0 +1,352 @@
+"""Per-stage timing for the data pipeline, and per-callback stats for the Dash apps.
+
+Wrap a stage in stage() or decorate it with @timed. Each stage records its
+duration, rows in and rows out:
+
+    with stage('layout') as record:
+        layout = build()
+        record['rows_out'] = len(layout.children)
+
+    @timed
+    def add_flags(df): ...
+
+Rows are counted from the first DataFrame/Series (or dict of frames)
+argument and from the return value. Stages nest: the outermost one on a
+thread is a run. A stage called more than once in the same place in a run,
+such as once per streamed batch, is merged into one entry with a call count.
+Every finished run is printed as one JSON log line (ECA_METRICS_LOG=0
+silences it). The recent runs and per-stage totals are served at /metrics,
+as JSON or, with ?format=prometheus, in Prometheus text format.
+
+Code on the request path takes run=False (stage(..., run=False) or
+@timed(run=False)): inside a run it is an ordinary stage, but on its own it
+only adds to the per-stage totals, so page loads neither log a line nor push
+pipeline runs out of the recent-runs history.
+
+CallbackMetrics is opt-in middleware around Dash callback dispatch (the
+_dash-update-component route). For each callback it keeps a rolling window
+(ECA_CALLBACK_WINDOW seconds, default 300) of latency, serialized response
+bytes and errors. It serves p50/p95/p99 of those at /metrics/callbacks and
+prints the same summary as a JSON log line every ECA_CALLBACK_LOG_INTERVAL
+seconds (default 60, 0 disables) when there was traffic. The apps install it
+when ECA_CALLBACK_METRICS=1.
+"""
+import collections
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_KEEP_RUNS = 20
+DEFAULT_CALLBACK_WINDOW = 300
+DEFAULT_CALLBACK_LOG_INTERVAL = 60
+# Per-callback cap on the samples in a window, so a traffic spike cannot grow memory
+DEFAULT_CALLBACK_SAMPLES = 10_000
+QUANTILES = (50, 95, 99)
+
+
+def count_rows(value):
+    """Rows in a frame, a dict of frames or the first of those in a tuple; None for anything else"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, dict):
+        if value and all(isinstance(v, (pd.DataFrame, pd.Series)) for v in value.values()):
+            return sum(len(v) for v in value.values())
+        return None
+    if isinstance(value, tuple):
+        for item in value:
+            rows = count_rows(item)
+            if rows is not None:
+                return rows
+    return None
+
+
+def _rows_in(args):
+    for arg in args:
+        rows = count_rows(arg)
+        if rows is not None:
+            return rows
+    return None
+
+
+def _add(total, value):
+    if value is None:
+        return total
+    return value if total is None else total + value
+
+
+class StageRecorder:
+    """Collects stage timings into runs and keeps the recent runs plus per-stage totals"""
+
+    def __init__(self, keep=None, log=None):
+        self.keep = keep or int(os.environ.get('ECA_METRICS_RUNS', DEFAULT_KEEP_RUNS))
+        self.log = os.environ.get('ECA_METRICS_LOG', '1') != '0' if log is None else log
+        self.runs = collections.deque(maxlen=self.keep)
+        self.totals = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None, run=True):
+        """Time the block; the yielded dict takes 'rows_in' / 'rows_out' if the caller knows them"""
+        frames = getattr(self._local, 'frames', None)
+        if frames is None:
+            frames = self._local.frames = []
+        path = '/'.join([frames[-1][0], name]) if frames else name
+        if not frames:
+            self._local.entries = collections.OrderedDict()
+            self._local.started = time.time()
+            self._local.run = run
+        record = {'rows_in': rows_in, 'rows_out': None, 'error': None}
+        # Entries are listed in the order the stages start, parents before their children
+        self._local.entries.setdefault(path, {'stage': path, 'calls': 0, 'seconds': 0.0, 'rows_in': None, 'rows_out': None})
+        frames.append((path, record))
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            frames.pop()
+            self._merge(path, record, seconds)
+            if not frames:
+                self._finish_run(path, seconds)
+
+    def timed(self, func=None, name=None, run=True):
+        """Decorator form of stage(); use as @timed or @timed(name='...', run=False)"""
+        if func is None:
+            return lambda func: self.timed(func, name, run)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.stage(name or func.__name__, rows_in=_rows_in(args), run=run) as record:
+                result = func(*args, **kwargs)
+                record['rows_out'] = count_rows(result)
+                return result
+        return wrapper
+
+    def _merge(self, path, record, seconds):
+        entry = self._local.entries[path]
+        entry['calls'] += 1
+        entry['seconds'] += seconds
+        entry['rows_in'] = _add(entry['rows_in'], record['rows_in'])
+        entry['rows_out'] = _add(entry['rows_out'], record['rows_out'])
+        if record['error']:
+            entry['error'] = record['error']
+
+    def _finish_run(self, name, seconds):
+        entries = list(self._local.entries.values())
+        for entry in entries:
+            entry['seconds'] = round(entry['seconds'], 6)
+        run = {
+            'event': 'stage_run',
+            'run': name,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self._local.started)),
+            'seconds': round(seconds, 6),
+            'pid': os.getpid(),
+            'thread': threading.current_thread().name,
+            'stages': entries,
+        }
+        keep = self._local.run
+        with self._lock:
+            if keep:
+                self.runs.append(run)
+            for entry in entries:
+                total = self.totals.setdefault(entry['stage'], {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+                total['calls'] += entry['calls']
+                total['seconds'] += entry['seconds']
+                total['max_seconds'] = max(total['max_seconds'], entry['seconds'])
+                total['last_seconds'] = entry['seconds']
+                total['last_rows_in'] = entry['rows_in']
+                total['last_rows_out'] = entry['rows_out']
+        if self.log and keep:
+            print(json.dumps(run, separators=(',', ':'), default=str), flush=True)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'runs': list(self.runs),
+                'stages': {name: dict(total) for name, total in self.totals.items()},
+            }
+
+    def prometheus(self):
+        """The per-stage totals in Prometheus text exposition format"""
+        stages = self.snapshot()['stages']
+        series = [
+            ('eca_stage_calls_total', 'counter', 'Times the stage ran', 'calls'),
+            ('eca_stage_seconds_total', 'counter', 'Total seconds spent in the stage', 'seconds'),
+            ('eca_stage_max_seconds', 'gauge', 'Slowest single run of the stage', 'max_seconds'),
+            ('eca_stage_last_seconds', 'gauge', 'Seconds in the latest run', 'last_seconds'),
+            ('eca_stage_last_rows_in', 'gauge', 'Rows into the stage in the latest run', 'last_rows_in'),
+            ('eca_stage_last_rows_out', 'gauge', 'Rows out of the stage in the latest run', 'last_rows_out'),
+        ]
+        lines = []
+        for metric, kind, help_text, key in series:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, total in sorted(stages.items()):
+                if total.get(key) is not None:
+                    label = name.replace('\\', '\\\\').replace('"', '\\"')
+                    lines.append(f'{metric}{{stage="{label}"}} {total[key]}')
+        return '\n'.join(lines) + '\n'
+
+    def register(self, server, path='/metrics'):
+        from flask import Response, jsonify, request
+
+        def metrics():
+            if request.args.get('format') == 'prometheus':
+                return Response(self.prometheus(), mimetype='text/plain; version=0.0.4')
+            return jsonify(self.snapshot())
+        server.add_url_rule(path, 'eca_metrics', metrics, methods=['GET'])
+        return self
+
+
+def callback_metrics_enabled():
+    return os.environ.get('ECA_CALLBACK_METRICS') == '1'
+
+
+def _quantiles(values):
+    if not values:
+        return {f"p{q}": None for q in QUANTILES}
+    points = np.percentile(np.asarray(values, dtype=float), QUANTILES)
+    return {f"p{q}": round(float(point), 3) for q, point in zip(QUANTILES, points)}
+
+
+class CallbackMetrics:
+    """Rolling latency, response size and error stats per Dash callback"""
+
+    def __init__(self, window=None, log_interval=None, max_samples=None, clock=time.monotonic):
+        self.window = window or float(os.environ.get('ECA_CALLBACK_WINDOW', DEFAULT_CALLBACK_WINDOW))
+        self.log_interval = (float(os.environ.get('ECA_CALLBACK_LOG_INTERVAL', DEFAULT_CALLBACK_LOG_INTERVAL))
+                             if log_interval is None else log_interval)
+        self.max_samples = max_samples or int(os.environ.get('ECA_CALLBACK_SAMPLES', DEFAULT_CALLBACK_SAMPLES))
+        self.clock = clock
+        self.app = None
+        # callback -> deque of (time, seconds, bytes, error); lifetime totals kept apart
+        self._samples = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+        self._last_log = clock()
+        self._since_log = 0
+
+    def callback_name(self, output):
+        """The callback function's name for a request's output id (the output id if unknown)"""
+        entry = self.app.callback_map.get(output) if self.app is not None and output else None
+        callback = entry.get('callback') if entry else None
+        return getattr(callback, '__name__', None) or output or 'unknown'
+
+    def record(self, name, seconds, size, error=False):
+        now = self.clock()
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = collections.deque(maxlen=self.max_samples)
+            samples.append((now, seconds, size, error))
+            totals = self._totals.setdefault(name, {'calls': 0, 'errors': 0})
+            totals['calls'] += 1
+            totals['errors'] += int(error)
+            self._since_log += 1
+            due = self.log_interval > 0 and now - self._last_log >= self.log_interval
+            if due:
+                self._last_log, self._since_log = now, 0
+        if due:
+            self.log_summary()
+
+    def _prune(self, now):
+        cutoff = now - self.window
+        for samples in self._samples.values():
+            while samples and samples[0][0] < cutoff:
+                samples.popleft()
+
+    def summary(self):
+        """callback -> window counts, error rate, latency (ms) and response bytes quantiles"""
+        with self._lock:
+            self._prune(self.clock())
+            windows = {name: list(samples) for name, samples in self._samples.items()}
+            totals = {name: dict(t) for name, t in self._totals.items()}
+        result = {}
+        for name, samples in sorted(windows.items()):
+            latencies = [seconds * 1000 for _, seconds, _, _ in samples]
+            sizes = [size for _, _, size, _ in samples]
+            errors = sum(1 for sample in samples if sample[3])
+            result[name] = {
+                'window_calls': len(samples),
+                'window_errors': errors,
+                'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+                'latency_ms': dict(_quantiles(latencies), max=round(max(latencies), 3) if latencies else None),
+                'response_bytes': dict(_quantiles(sizes), max=max(sizes) if sizes else None),
+                'calls_total': totals[name]['calls'],
+                'errors_total': totals[name]['errors'],
+            }
+        return {'window_seconds': self.window, 'callbacks': result}
+
+    def log_summary(self):
+        print(json.dumps(dict(self.summary(), event='callback_metrics'), separators=(',', ':')), flush=True)
+
+    def prometheus(self):
+        lines = []
+        series = [
+            ('eca_callback_latency_ms', 'Callback latency over the window, in milliseconds', 'latency_ms'),
+            ('eca_callback_response_bytes', 'Serialized callback response size over the window', 'response_bytes'),
+        ]
+        callbacks = self.summary()['callbacks']
+        for metric, help_text, key in series:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} summary")
+            for name, stats in callbacks.items():
+                for q in QUANTILES:
+                    if stats[key][f"p{q}"] is not None:
+                        lines.append(f'{metric}{{callback="{name}",quantile="{q / 100}"}} {stats[key][f"p{q}"]}')
+                lines.append(f'{metric}_count{{callback="{name}"}} {stats["window_calls"]}')
+        for metric, help_text, key in (('eca_callback_calls_total', 'Callback requests', 'calls_total'),
+                                       ('eca_callback_errors_total', 'Callback requests that failed', 'errors_total')):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, stats in callbacks.items():
+                lines.append(f'{metric}{{callback="{name}"}} {stats[key]}')
+        return '\n'.join(lines) + '\n'
+
+    def install(self, app, path='/metrics/callbacks'):
+        """Time every callback request of a Dash app and serve the stats at path"""
+        import flask
+
+        self.app = app
+        server = app.server
+
+        def is_dispatch():
+            return flask.request.path.endswith('_dash-update-component')
+
+        @server.before_request
+        def start_timer():
+            if is_dispatch():
+                flask.g.eca_callback_start = time.perf_counter()
+
+        @server.after_request
+        def record_callback(response):
+            start = flask.g.pop('eca_callback_start', None)
+            if start is not None:
+                body = flask.request.get_json(silent=True) or {}
+                size = response.content_length if response.direct_passthrough else len(response.get_data())
+                self.record(self.callback_name(body.get('output')), time.perf_counter() - start,
+                            size or 0, error=response.status_code >= 400)
+            return response
+
+        def endpoint():
+            if flask.request.args.get('format') == 'prometheus':
+                return flask.Response(self.prometheus(), mimetype='text/plain; version=0.0.4')
+            return flask.jsonify(self.summary())
+        server.add_url_rule(path, 'eca_callback_metrics', endpoint, methods=['GET'])
+        return self
+
+
+# One recorder per process, shared by every instrumented module
+recorder = StageRecorder()
+stage = recorder.stage
+timed = recorder.timed
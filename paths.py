@@ -0,0 +1,23 @@
+"""Source workbook paths shared by website.py (runtime) and bundle.py (build time).
+
+The bundle records fingerprints of these exact files, and load_data compares
+them with the same files, so both sides must read the paths from here.
+"""
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Assumes your Excel files are stored in a "data" folder next to the project
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+
+input_path = os.path.join(DATA_DIR, "ECA Campaigns_FY25_ALL_v2.xlsx")
+members_path = os.path.join(DATA_DIR, "ECA Campaign Members_FY25_ALL.xlsx")
+v2_path = os.path.join(DATA_DIR, "ECA Campaigns_FY25_ALL_v2.xlsx")
+
+
+def sources():
+    """The pipeline's inputs by name, as frame_cache and the bundle manifest key them"""
+    return {'input': input_path, 'members': members_path, 'v2': v2_path}
+
+
+def missing_sources(paths=None):
+    return [path for path in (paths or sources()).values() if not os.path.exists(path)]
@@ -0,0 +1,361 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from metrics import timed
+from sources import DEFAULT_BATCH_ROWS, SourceRegistry, concat_batches, iter_excel_batches, read_excel_streaming
+
+# ------------------------------
+# Shared constants
+
+# Define Stata's epoch
+STATA_EPOCH = pd.Timestamp('1960-01-01')
+
+FIRST_TIME_TYPES = [
+    "1st Time Inquiry – Requested by Org or Group",
+    "1st Time Outreach – Initiated by ECA Staff"
+]
+
+# Flag column -> category values that set it (ecaactivitytype / interactiontype)
+ACTIVITY_FLAGS = {
+    'meeting': ['Meeting'],
+    'event': ['Event'],
+}
+
+INTERACTION_FLAGS = {
+    'firsttime': FIRST_TIME_TYPES,
+    'frst_inquiry': ["1st Time Inquiry – Requested by Org or Group"],
+    'frst_outreach': ["1st Time Outreach – Initiated by ECA Staff"],
+    'followup_mtg': ["Follow Up Project Planning or Problem-Solving Meeting"],
+    'reoccurring': ["Reoccurring activity"],
+    'repeat': ["Repeat – For Purposes of Ongoing Participation or to Rep ECA"],
+    'community_mtg': ["Community Meeting"],
+    'standalone': ["Stand alone activity"],
+    'scheduling': ["Scheduling or Show-and-Tell Visit"],
+    'concerns': ["Resident, Institutional or City Concern"],
+    'other': ["Other, such as Room Request"],
+}
+
+FRAME_NAMES = ['df', 'df_filtered', 'members_df', 'members_filtered', 'first_interactions']
+
+# String columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+# Day counts that may be missing: always nullable Int32 so the schema does not depend on the data
+NULLABLE_DAY_COLUMNS = ['num_startdate', 'days_from_first', 'first_day']
+INT32_MIN, INT32_MAX = np.iinfo('int32').min, np.iinfo('int32').max
+
+# ------------------------------
+# Pipeline stages
+
+def normalize_columns(df):
+    df.columns = df.columns.str.lower().str.replace(' ', '')
+    return df
+
+@timed
+def load_campaigns(input_path):
+    """Read the campaigns export and normalise its column names"""
+    return normalize_columns(pd.read_excel(input_path))
+
+@timed
+def split_date_columns(df):
+    """Split the date/time columns and add Stata-style day numbers (row-local)"""
+    df['startdate'] = df['startdateandtime'].str.split(',').str[0]
+    df['enddate'] = df['enddateandtime'].str.split(',').str[0]
+    df['starttime'] = df['startdateandtime'].str.split(',').str[1]
+    df['endtime'] = df['enddateandtime'].str.split(',').str[1]
+    df.drop(columns=['startdateandtime', 'enddateandtime'], inplace=True)
+    df['num_startdate'] = pd.to_datetime(df['startdate'], format='%m/%d/%Y', errors='coerce')
+    df['num_startdate'] = (df['num_startdate'] - STATA_EPOCH).dt.days
+    return df
+
+@timed
+def add_campaign_sequence(df):
+    """Add parent campaign ids and per-campaign sequence numbers (needs the whole frame)"""
+    df['parents_id'] = df['parentcampaignname'].astype('category').cat.codes
+    # Stable sort so rows on the same day keep export order (incremental.py relies on this)
+    df.sort_values(by=['parentcampaignname', 'num_startdate'], kind='mergesort', inplace=True)
+    df['num_campaigns'] = df.groupby('parentcampaignname').cumcount() + 1
+    return df
+
+def split_dates(df):
+    return add_campaign_sequence(split_date_columns(df))
+
+def iter_campaign_batches(input_path, batch_size=DEFAULT_BATCH_ROWS):
+    """Stream the campaigns export, running the row-local stages on each batch"""
+    for batch in iter_excel_batches(input_path, batch_size):
+        batch = normalize_columns(batch)
+        batch = split_date_columns(batch)
+        yield add_flags(batch)
+
+@timed
+def load_campaigns_streaming(input_path, batch_size=DEFAULT_BATCH_ROWS):
+    """Equivalent of add_flags(split_dates(load_campaigns(path))) in bounded batches
+
+    Only the already-processed batches are kept, so the transient openpyxl and
+    raw date-string overhead is bounded by batch_size rather than file size.
+    """
+    df = concat_batches(iter_campaign_batches(input_path, batch_size))
+    df = add_campaign_sequence(df)
+    # Keep the column order of the whole-frame path (flags come last)
+    flag_columns = list(ACTIVITY_FLAGS) + list(INTERACTION_FLAGS)
+    return df[[col for col in df.columns if col not in flag_columns] + flag_columns]
+
+def encode_flags(frame, column, flags, dtype='uint8'):
+    """Add one 0/1 column per entry of flags in a single vectorized pass
+
+    flags maps an output column name to the category values that set it.
+    The source column is factorized once; each row's flags are then a row
+    lookup into a (categories x flags) table, so cost does not grow with
+    the number of string comparisons.
+    """
+    codes, categories = pd.factorize(frame[column])
+    table = np.zeros((len(categories) + 1, len(flags)), dtype=dtype)
+    for j, values in enumerate(flags.values()):
+        table[:-1, j] = categories.isin(values)
+    # factorize marks missing values as -1, which picks the all-zero last row
+    encoded = pd.DataFrame(table[codes], index=frame.index, columns=list(flags))
+    for name in flags:
+        frame[name] = encoded[name]
+    return frame
+
+def interaction_column_name(interaction):
+    return interaction.lower().replace(' ', '_').replace('–', '').replace('(', '').replace(')', '')
+
+@timed
+def add_flags(df):
+    """Add the binary activity and interaction type columns"""
+    df = encode_flags(df, 'ecaactivitytype', ACTIVITY_FLAGS)
+    df = encode_flags(df, 'interactiontype', INTERACTION_FLAGS)
+    return df
+
+def add_interaction_type_flags(df_filtered, interaction_types):
+    """Add one count column per interaction type, named after the type"""
+    flags = {interaction_column_name(interaction): [interaction] for interaction in interaction_types}
+    return encode_flags(df_filtered, 'interactiontype', flags)
+
+@timed
+def filter_members(members_df):
+    """Keep only the members rows that record a first-time interaction"""
+    return members_df[
+        (members_df['Interaction Type'] == "1st Time Inquiry – Requested by Org or Group") |
+        (members_df['Interaction Type'] == "1st Time Outreach – Initiated by ECA Staff")
+    ]
+
+@timed
+def filter_interactions(df, unique_parent_campaigns):
+    """Restrict df to the given parent campaigns and add per-type counts"""
+    df_filtered = df[df['parentcampaignname'].isin(unique_parent_campaigns)].copy()
+    df_filtered = add_interaction_type_flags(df_filtered, df['interactiontype'].dropna().unique())
+    df_filtered['total_interactions'] = df_filtered.groupby('parentcampaignname')['interactiontype'].transform('count')
+    return df_filtered
+
+@timed
+def first_interaction_days(df_filtered):
+    """Earliest first-time interaction day per parent campaign
+
+    Campaigns without a first-time row are kept with a NaN day instead of
+    raising KeyError further down.
+    """
+    is_first = df_filtered['interactiontype'].isin(FIRST_TIME_TYPES)
+    first_days = df_filtered['num_startdate'].where(is_first).groupby(df_filtered['parentcampaignname']).min()
+    return first_days.rename('first_day')
+
+@timed
+def add_days_from_first(df_filtered):
+    """Add days since each campaign's first-time interaction"""
+    is_first = df_filtered['interactiontype'].isin(FIRST_TIME_TYPES)
+    first_day = df_filtered['parentcampaignname'].map(first_interaction_days(df_filtered))
+    days_from_first = (df_filtered['num_startdate'] - first_day).astype(float)
+    # Later first-time rows are not "the" first interaction, so drop them from the timeline
+    days_from_first[is_first & (days_from_first > 0)] = None
+    df_filtered['days_from_first'] = days_from_first
+    return df_filtered
+
+def campaign_member_counts(members_filtered):
+    """Parent campaign -> number of members_filtered rows (the cards' "People involved"), in one pass"""
+    counts = members_filtered['Parent Campaign: Campaign Name'].value_counts(sort=False)
+    # A categorical column also counts categories with no rows; the cards only list real campaigns
+    return {name: int(count) for name, count in counts.items() if count}
+
+@timed
+def build_member_index(members_df):
+    """Parent campaign -> sub-campaign -> ECA affiliation -> sorted unique member names"""
+    parent_col, sub_col = 'Parent Campaign: Campaign Name', 'Campaign Name'
+    eca_col, name_col = 'ECA Affiliation Name', 'Full Name'
+    index = {parent: {} for parent in members_df[parent_col].dropna().unique()}
+    subs = members_df[[parent_col, sub_col]].dropna().drop_duplicates()
+    for parent, sub in subs.itertuples(index=False):
+        index[parent][sub] = {}
+    rows = members_df[[parent_col, sub_col, eca_col, name_col]].dropna(subset=[parent_col, sub_col, eca_col])
+    for (parent, sub, eca), names in rows.groupby([parent_col, sub_col, eca_col], observed=True)[name_col]:
+        index[parent][sub][eca] = sorted(names.dropna().unique())
+    return index
+
+# ------------------------------
+# Compact dtypes
+
+def _integral(values):
+    return bool((values == np.floor(values)).all()) and (
+        values.empty or (values.min() >= INT32_MIN and values.max() <= INT32_MAX))
+
+def dtype_plan(frame):
+    """Column -> smaller dtype; columns that are already compact are left out"""
+    plan = {}
+    for col in frame.columns:
+        values = frame[col]
+        dtype = values.dtype
+        if col in NULLABLE_DAY_COLUMNS and (pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_float_dtype(dtype)):
+            if _integral(values.dropna()):
+                plan[col] = 'Int32'
+        elif dtype == object:
+            present = values.dropna()
+            if (pd.api.types.infer_dtype(present, skipna=True) == 'string'
+                    and present.nunique() <= CATEGORY_MAX_RATIO * len(values)):
+                plan[col] = 'category'
+        elif pd.api.types.is_integer_dtype(dtype) and dtype.itemsize > 1:
+            if values.empty:
+                continue
+            low, high = values.min(), values.max()
+            if low >= 0 and high <= 1:
+                plan[col] = 'uint8'
+            elif dtype.itemsize > 4 and low >= INT32_MIN and high <= INT32_MAX:
+                plan[col] = 'int32'
+        elif pd.api.types.is_float_dtype(dtype):
+            present = values.dropna()
+            if not present.empty and _integral(present):
+                plan[col] = 'Int32'
+    return plan
+
+def memory_mb(frame):
+    return frame.memory_usage(deep=True).sum() / 1e6
+
+@timed
+def compact_frames(frames):
+    """Apply each frame's dtype plan and print the memory it saved"""
+    compacted = {}
+    for name, frame in frames.items():
+        before = memory_mb(frame)
+        compacted[name] = frame.astype(dtype_plan(frame))
+        after = memory_mb(compacted[name])
+        print(f"Compact dtypes {name}: {before:.2f} MB -> {after:.2f} MB")
+    return compacted
+
+# ------------------------------
+# Utility: clean campaign names
+
+# Everything up to the first " - ", then each known prefix at most once (in
+# this order), then any leading dashes -- the same steps the old per-row
+# loop took, as one precompiled pattern
+_CAMPAIGN_PREFIX_RE = re.compile(
+    r'^(?:.*? - \s*)?'
+    r'(?:PARENT1: CEC\s*)?(?:PARENT 1: CEC\s*)?(?:PARENT1:\s*)?(?:PARENT 1:\s*)?(?:CEC\s*)?'
+    r'[\-\–]*',
+    re.DOTALL
+)
+
+def clean_parent_campaign(name):
+    if isinstance(name, str):
+        return _CAMPAIGN_PREFIX_RE.sub('', name, count=1).strip()
+    return name
+
+def clean_campaign_column(series, canonical):
+    """Clean a campaign-name column once per distinct value
+
+    canonical is a raw -> cleaned dict shared by every frame in a load, so a
+    name that appears in both the campaigns and members exports is cleaned once.
+    """
+    codes, uniques = pd.factorize(series)
+    for name in uniques:
+        if name not in canonical:
+            canonical[name] = clean_parent_campaign(name)
+    # The trailing NaN is what factorize's -1 (missing) code picks up
+    cleaned = np.array([canonical[name] for name in uniques] + [np.nan], dtype=object)
+    return pd.Series(cleaned[codes], index=series.index, name=series.name)
+
+# ------------------------------
+# Full run
+
+def resolve_batch_size(batch_size=None):
+    if batch_size is None:
+        batch_size = int(os.environ.get('ECA_STREAM_BATCH_ROWS', DEFAULT_BATCH_ROWS))
+    return batch_size
+
+def excel_reader(batch_size=None):
+    """path -> DataFrame reader: streaming in batches, or pd.read_excel when batch_size is 0"""
+    batch_size = resolve_batch_size(batch_size)
+    if batch_size:
+        return lambda path: read_excel_streaming(path, batch_size)
+    return pd.read_excel
+
+@timed
+def build_frames(input_path, members_path, v2_path, batch_size=None, registry=None):
+    """Run the whole pipeline and return (frames, stats)
+
+    batch_size (default ECA_STREAM_BATCH_ROWS, else DEFAULT_BATCH_ROWS) sets the
+    streaming reader's batch size; 0 falls back to a whole-file pd.read_excel.
+    Every workbook goes through one SourceRegistry, so each is parsed once.
+    """
+    batch_size = resolve_batch_size(batch_size)
+    registry = registry or SourceRegistry(excel_reader(batch_size))
+    if batch_size:
+        df = load_campaigns_streaming(input_path, batch_size)
+        registry.note_parse(input_path)
+    else:
+        df = add_flags(split_dates(normalize_columns(registry.read(input_path))))
+
+    members_df = registry.read(members_path)
+    members_filtered = filter_members(members_df).copy()
+    unique_parent_campaigns = members_filtered['Parent Campaign: Campaign Name'].unique()
+
+    df_filtered = filter_interactions(df, unique_parent_campaigns)
+    df_filtered = add_days_from_first(df_filtered)
+    v2_first_time_total = count_first_time(registry, v2_path, input_path, df)
+    registry.report()
+    return finish_frames(df, df_filtered, members_df, members_filtered, v2_first_time_total)
+
+@timed
+def count_first_time(registry, v2_path, input_path, df):
+    """First-time rows in the v2 export, reusing df when it is the same workbook"""
+    if registry.same_content(v2_path, input_path):
+        # df holds every row of that workbook, flagged; no need to parse it again
+        registry.note_reuse(v2_path)
+        return int(df['firsttime'].sum())
+    v2_df = registry.read(v2_path)
+    return len(v2_df[
+        (v2_df['Interaction Type'] == "1st Time Inquiry – Requested by Org or Group") |
+        (v2_df['Interaction Type'] == "1st Time Outreach – Initiated by ECA Staff")
+    ])
+
+def headline_stats(members_filtered, v2_first_time_total):
+    unique_parent_campaigns = members_filtered['Parent Campaign: Campaign Name'].unique()
+    return {
+        'v2_first_time_total': v2_first_time_total,
+        'unique_eca': int(members_filtered[members_filtered['ECA Affiliation Name'].notna()]['ECA Affiliation Name'].nunique()),
+        'unique_campaigns': len(unique_parent_campaigns),
+    }
+
+@timed
+def clean_campaign_names(df, df_filtered, members_df, members_filtered):
+    """Clean the parent campaign names of all four frames in place, sharing one cache"""
+    canonical_names = {}
+    df['parentcampaignname'] = clean_campaign_column(df['parentcampaignname'], canonical_names)
+    df_filtered['parentcampaignname'] = clean_campaign_column(df_filtered['parentcampaignname'], canonical_names)
+    members_df['Parent Campaign: Campaign Name'] = clean_campaign_column(members_df['Parent Campaign: Campaign Name'], canonical_names)
+    members_filtered['Parent Campaign: Campaign Name'] = clean_campaign_column(members_filtered['Parent Campaign: Campaign Name'], canonical_names)
+
+@timed
+def finish_frames(df, df_filtered, members_df, members_filtered, v2_first_time_total):
+    """Headline stats, campaign-name cleaning and the frames dict shared by every build path"""
+    stats = headline_stats(members_filtered, v2_first_time_total)
+    clean_campaign_names(df, df_filtered, members_df, members_filtered)
+
+    frames = {
+        'df': df,
+        'df_filtered': df_filtered,
+        'members_df': members_df,
+        'members_filtered': members_filtered,
+        'first_interactions': first_interaction_days(df_filtered).reset_index(),
+    }
+    return compact_frames(frames), stats
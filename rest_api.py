@@ -0,0 +1,160 @@
+"""JSON aggregate endpoints served next to the Dash app.
+
+    GET /api/summary             headline numbers shown on the dashboard cards
+    GET /api/campaigns           per parent campaign: members, interactions,
+                                 first-time interactions, span, sites, types
+    GET /api/sites               per site: campaigns, interactions, first-time
+    GET /api/interaction-types   per interaction type: interactions, campaigns
+
+Payloads are computed once per data version and kept as compact JSON plus a
+gzip copy. Responses carry a strong ETag and honour If-None-Match, so a
+client polling an unchanged dataset gets a bodiless 304.
+"""
+import gzip
+import hashlib
+import json
+import threading
+
+import pandas as pd
+from flask import Response, request
+from werkzeug.http import unquote_etag
+
+from timeline import ordered_types
+
+
+def _number(value):
+    # numpy scalars, NaN and pd.NA -> plain JSON values
+    if pd.isna(value):
+        return None
+    return int(value) if float(value).is_integer() else float(value)
+
+
+def campaign_aggregates(df_filtered, members_filtered):
+    members = members_filtered['Parent Campaign: Campaign Name'].value_counts(sort=False)
+    grouped = df_filtered.groupby('parentcampaignname', sort=True, observed=True)
+    summary = grouped.agg(
+        interactions=('interactiontype', 'count'),
+        first_time=('firsttime', 'sum'),
+        span_days=('days_from_first', 'max'),
+    )
+    # An export without a site column has no per-site breakdown (as in site_figures)
+    if 'site' in df_filtered:
+        sites = df_filtered.dropna(subset=['site']).groupby('parentcampaignname', observed=True)['site'].unique()
+    else:
+        sites = {}
+    types = {}
+    for (name, interaction_type), count in df_filtered.groupby(['parentcampaignname', 'interactiontype'], observed=True).size().items():
+        types.setdefault(name, {})[interaction_type] = int(count)
+    return [
+        {
+            'campaign': name,
+            'members': int(members.get(name, 0)),
+            'interactions': int(row.interactions),
+            'first_time': int(row.first_time),
+            'span_days': _number(row.span_days),
+            'sites': sorted(sites.get(name, [])),
+            'types': types.get(name, {}),
+        }
+        for name, row in summary.iterrows()
+    ]
+
+
+def site_aggregates(df_filtered):
+    if 'site' not in df_filtered:
+        return []
+    summary = df_filtered.groupby('site', sort=True, observed=True).agg(
+        campaigns=('parentcampaignname', 'nunique'),
+        interactions=('interactiontype', 'count'),
+        first_time=('firsttime', 'sum'),
+    )
+    return [
+        {'site': site, 'campaigns': int(row.campaigns), 'interactions': int(row.interactions),
+         'first_time': int(row.first_time)}
+        for site, row in summary.iterrows()
+    ]
+
+
+def interaction_type_aggregates(df_filtered):
+    summary = df_filtered.groupby('interactiontype', observed=True).agg(
+        interactions=('interactiontype', 'size'),
+        campaigns=('parentcampaignname', 'nunique'),
+    )
+    # Dashboard legend order first, then anything the legend does not know about
+    order = [t for t in ordered_types if t in summary.index]
+    order += sorted(t for t in summary.index if t not in ordered_types)
+    return [
+        {'interaction_type': t, 'interactions': int(summary.at[t, 'interactions']),
+         'campaigns': int(summary.at[t, 'campaigns'])}
+        for t in order
+    ]
+
+
+def compute_payloads(data):
+    """Endpoint path -> JSON-ready payload for one loaded dataset"""
+    df_filtered, members_filtered = data['df_filtered'], data['members_filtered']
+    return {
+        '/api/summary': {
+            'data_version': data.get('data_version'),
+            'v2_first_time_total': int(data['v2_first_time_total']),
+            'unique_eca': int(data['unique_eca']),
+            'unique_campaigns': int(data['unique_campaigns']),
+        },
+        '/api/campaigns': campaign_aggregates(df_filtered, members_filtered),
+        '/api/sites': site_aggregates(df_filtered),
+        '/api/interaction-types': interaction_type_aggregates(df_filtered),
+    }
+
+
+class Encoded:
+    """One payload as compact JSON bytes, their gzip copy and a strong ETag"""
+
+    def __init__(self, payload):
+        self.body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        self.gzipped = gzip.compress(self.body, compresslevel=6, mtime=0)
+        self.etag = '"%s"' % hashlib.sha256(self.body).hexdigest()[:20]
+
+
+def _accepts_gzip():
+    return any(part.split(';')[0].strip() == 'gzip'
+               for part in request.headers.get('Accept-Encoding', '').split(','))
+
+
+def respond(encoded):
+    use_gzip = _accepts_gzip()
+    # The gzip representation is a different entity, so it gets its own tag
+    etag = encoded.etag[:-1] + '-gz"' if use_gzip else encoded.etag
+    headers = {'ETag': etag, 'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+    # Weak comparison, as If-None-Match requires: matches "*", W/"tag" and any tag in the list
+    if request.if_none_match.contains_weak(unquote_etag(etag)[0]):
+        return Response(status=304, headers=headers)
+    if use_gzip:
+        headers['Content-Encoding'] = 'gzip'
+    return Response(encoded.gzipped if use_gzip else encoded.body, status=200,
+                    mimetype='application/json', headers=headers)
+
+
+class AggregateAPI:
+    """Registers the endpoints on a Flask server; get_data() returns the current dataset dict"""
+
+    def __init__(self, get_data):
+        self.get_data = get_data
+        self._lock = threading.Lock()
+        self._version = None
+        self._encoded = {}
+
+    def encoded(self, path):
+        data = self.get_data()
+        version = data.get('data_version')
+        with self._lock:
+            if version != self._version or not self._encoded:
+                # A bundle ships its payloads precomputed; otherwise build them once per version
+                payloads = data.get('api') or compute_payloads(data)
+                self._encoded = {name: Encoded(payload) for name, payload in payloads.items()}
+                self._version = version
+            return self._encoded[path]
+
+    def register(self, server):
+        for path in ('/api/summary', '/api/campaigns', '/api/sites', '/api/interaction-types'):
+            server.add_url_rule(path, 'eca' + path.replace('/', '_').replace('-', '_'),
+                                lambda path=path: respond(self.encoded(path)), methods=['GET'])
+        return self
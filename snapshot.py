@@ -0,0 +1,101 @@
+import threading
+import time
+
+# ------------------------------
+# Stale-while-revalidate snapshot cache
+
+
+class Snapshot:
+    def __init__(self, value, loaded_at):
+        self.value = value
+        self.loaded_at = loaded_at
+
+
+class SnapshotCache:
+    """Serve the current snapshot immediately; refresh it in the background once it is ttl old
+
+    Only the first get() waits for load(). After that a stale snapshot starts
+    one background refresh and is returned as-is; the refreshed value replaces
+    it with a single reference swap, so readers see either the old snapshot or
+    the new one, never a mix. A failed refresh keeps the old snapshot and is
+    retried after retry_after seconds.
+    """
+
+    def __init__(self, load, ttl=300, retry_after=30, clock=time.monotonic):
+        self.load = load
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.clock = clock
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._first_load = threading.Lock()
+        self._refreshing = False
+        self._next_attempt = 0
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_duration = None
+
+    def _load(self):
+        start = self.clock()
+        try:
+            value = self.load()
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+                self.last_error = str(e)
+                self._next_attempt = self.clock() + self.retry_after
+            raise
+        snapshot = Snapshot(value, self.clock())
+        with self._lock:
+            self._snapshot = snapshot
+            self.refreshes += 1
+            self.last_error = None
+            self.last_duration = snapshot.loaded_at - start
+        return snapshot
+
+    def _refresh(self):
+        try:
+            self._load()
+        except Exception as e:
+            print(f"Error refreshing data, keeping the previous snapshot: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def get(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Cold start: nothing to serve yet, so callers wait on one load
+            with self._first_load:
+                snapshot = self._snapshot or self._load()
+            return snapshot.value
+
+        now = self.clock()
+        if now - snapshot.loaded_at >= self.ttl:
+            with self._lock:
+                start = not self._refreshing and now >= self._next_attempt
+                if start:
+                    self._refreshing = True
+            if start:
+                threading.Thread(target=self._refresh, name="snapshot-refresh", daemon=True).start()
+        return snapshot.value
+
+    def age(self):
+        """Seconds since the current snapshot was loaded (None before the first load)"""
+        snapshot = self._snapshot
+        return None if snapshot is None else self.clock() - snapshot.loaded_at
+
+    def info(self):
+        age = self.age()
+        with self._lock:
+            return {
+                'age_seconds': None if age is None else round(age, 3),
+                'ttl_seconds': self.ttl,
+                'stale': age is not None and age >= self.ttl,
+                'refreshing': self._refreshing,
+                'refreshes': self.refreshes,
+                'failures': self.failures,
+                'last_error': self.last_error,
+                'last_load_seconds': None if self.last_duration is None else round(self.last_duration, 3),
+            }
@@ -0,0 +1,200 @@
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+from metrics import stage
+
+# ------------------------------
+# Streaming Excel reader
+
+DEFAULT_BATCH_ROWS = 50_000
+
+# Strings pd.read_excel treats as missing by default, so batches match a full read
+NA_STRINGS = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+    '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+]
+
+
+def _cell(value):
+    # Mirror pandas' openpyxl reader: integral floats come back as ints
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _dedup_columns(columns):
+    """Rename repeated headers the way pd.read_excel does: a, a.1, a.2 (skipping names already taken)"""
+    columns = list(columns)
+    counts = {}
+    for i, col in enumerate(columns):
+        original, count = col, counts.get(col, 0)
+        while count > 0:
+            counts[original] = count + 1
+            col = f"{original}.{count}"
+            count = count + 1 if col in columns else counts.get(col, 0)
+        columns[i] = col
+        counts[col] = count + 1
+    return columns
+
+
+def _to_frame(rows, columns, start, dtypes):
+    frame = pd.DataFrame(rows, columns=columns, index=pd.RangeIndex(start, start + len(rows)))
+    for col in frame.columns[frame.dtypes == object]:
+        values = frame[col]
+        frame[col] = values.where(~values.isin(NA_STRINGS))
+    # A column that is empty in this batch stays object: inferring it would make it float64
+    # here but object (strings) in the next batch. concat_batches settles it afterwards.
+    for col in frame.columns[frame.notna().any()]:
+        frame[col] = frame[col].infer_objects()
+    if dtypes:
+        frame = frame.astype({col: dtype for col, dtype in dtypes.items() if col in frame.columns})
+    return frame
+
+
+def iter_excel_batches(path, batch_size=DEFAULT_BATCH_ROWS, sheet_name=None, dtypes=None):
+    """Yield DataFrames of at most batch_size rows from an .xlsx file
+
+    Uses openpyxl's read-only mode, so only one batch of cells is held in
+    memory at a time. The first row is the header; blank rows are skipped and
+    the batches carry a running RangeIndex, exactly as pd.read_excel would
+    number the rows. dtypes optionally pins column dtypes across batches.
+    """
+    # Imported here so importing the dashboard does not pay for openpyxl
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _dedup_columns(f"Unnamed: {i}" if col is None else str(col) for i, col in enumerate(header))
+        width = len(columns)
+        batch, start = [], 0
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            row = list(row[:width]) + [None] * (width - len(row))
+            batch.append([_cell(value) for value in row])
+            if len(batch) >= batch_size:
+                yield _to_frame(batch, columns, start, dtypes)
+                start += len(batch)
+                batch = []
+        if batch:
+            yield _to_frame(batch, columns, start, dtypes)
+    finally:
+        workbook.close()
+
+
+def read_excel_streaming(path, batch_size=DEFAULT_BATCH_ROWS, sheet_name=None, dtypes=None):
+    """pd.read_excel replacement built from iter_excel_batches"""
+    return concat_batches(iter_excel_batches(path, batch_size, sheet_name, dtypes), skip=dtypes or ())
+
+
+def concat_batches(batches, skip=()):
+    """pd.concat of the batches, with object columns' dtypes settled over the whole frame
+
+    Each batch is split into its own copies of its columns as it arrives, so
+    the batch itself is freed straight away. The frame is then put together
+    one column at a time, releasing that column's pieces as it goes. Peak
+    memory is about one copy of the data plus a column, rather than the
+    list of batches plus the concatenated frame. Columns in skip (pinned
+    dtypes) are left as they are; every other object column is inferred, as
+    pd.read_excel would, e.g. ints and NaNs from different batches become float64.
+    """
+    pieces, indexes = {}, []
+    for batch in batches:
+        for col in batch.columns:
+            pieces.setdefault(col, []).append(batch[col].copy())
+        indexes.append(batch.index)
+        del batch
+    if not indexes:
+        return pd.DataFrame()
+    index = indexes[0].append(indexes[1:])
+    frame = pd.DataFrame(index=index)
+    for col in list(pieces):
+        column = pd.concat(pieces.pop(col), copy=False)
+        if column.dtype == object and col not in skip:
+            column = column.infer_objects()
+        frame[col] = column.values
+    return frame
+
+
+# ------------------------------
+# Source registry
+
+class SourceRegistry:
+    """Parses each source workbook at most once per run
+
+    Parsed frames are memoized by content (SHA-256, looked up through the
+    resolved path, size and mtime), so two paths to the same file -- or the
+    same file asked for twice -- share one parse. read() hands out deep
+    copies, so a consumer writing values in place (e.g. with .loc) cannot
+    change what later reads see.
+    """
+
+    def __init__(self, reader=pd.read_excel):
+        self.reader = reader
+        self._hashes = {}
+        self._frames = {}
+        self._lock = threading.Lock()
+        self.parses = 0
+        self.parses_avoided = 0
+        self.paths = {}
+
+    def content_key(self, path):
+        path = os.path.realpath(path)
+        st = os.stat(path)
+        stat_key = (path, st.st_size, st.st_mtime_ns)
+        if stat_key not in self._hashes:
+            digest = hashlib.sha256()
+            with open(path, "rb") as fh:
+                for chunk in iter(lambda: fh.read(1 << 20), b""):
+                    digest.update(chunk)
+            self._hashes[stat_key] = digest.hexdigest()
+        key = self._hashes[stat_key]
+        self.paths.setdefault(key, set()).add(path)
+        return key
+
+    def same_content(self, path, other):
+        return self.content_key(path) == self.content_key(other)
+
+    def read(self, path):
+        key = self.content_key(path)
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                with stage('parse_source') as record:
+                    frame = self.reader(path)
+                    record['rows_out'] = len(frame)
+                self._frames[key] = frame
+                self.parses += 1
+            else:
+                self.parses_avoided += 1
+        return frame.copy()
+
+    def note_parse(self, path):
+        """Record a parse done outside read() (e.g. a streamed pass over the file)"""
+        self.content_key(path)
+        self.parses += 1
+
+    def note_reuse(self, path):
+        """Record that a consumer was served from an earlier parse of path's content"""
+        self.content_key(path)
+        self.parses_avoided += 1
+
+    def diagnostics(self):
+        return {
+            'parses': self.parses,
+            'parses_avoided': self.parses_avoided,
+            'sources': sorted(path for paths in self.paths.values() for path in paths),
+        }
+
+    def report(self):
+        info = self.diagnostics()
+        print(f"Sources: {info['parses']} workbook parse(s), {info['parses_avoided']} avoided "
+              f"across {len(info['sources'])} path(s)")
@@ -0,0 +1,490 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# ------------------------------
+# Timeline figure for the "Campaign Timeline by Parent Campaign" graph
+
+ordered_types = [
+    "1st Time Inquiry – Requested by Org or Group",    # Must be first
+    "1st Time Outreach – Initiated by ECA Staff",      # Must be second
+    "Follow Up Project Planning or Problem-Solving Meeting",
+    "Reoccurring activity",
+    "Repeat – For Purposes of Ongoing Participation or to Rep ECA",
+    "Community Meeting",
+    "Stand alone activity",
+    "Scheduling or Show-and-Tell Visit",
+    "Resident, Institutional or City Concern",
+    "Other, such as Room Request"
+]
+
+color_map = {
+    ordered_types[0]: "#1f77b4",  # First Time Inquiry - Blue
+    ordered_types[1]: "#2ca02c",  # First Time Outreach - Green
+    ordered_types[2]: "#FF0000",  # Red
+    ordered_types[3]: "#00FF00",  # Green
+    ordered_types[4]: "#0000FF",  # Blue
+    ordered_types[5]: "#FFA500",  # Orange
+    ordered_types[6]: "#800080",  # Purple
+    ordered_types[7]: "#008080",  # Teal
+    ordered_types[8]: "#FF69B4",  # Pink
+    ordered_types[9]: "#808080"   # Gray
+}
+
+# 'webgl': one Scattergl trace per interaction type + one Bar trace (default)
+# 'svg':   same vectorized traces drawn with SVG Scatter
+# 'legacy': one trace per point / per campaign, as the dashboard originally did
+TIMELINE_MODES = ('webgl', 'svg', 'legacy')
+DEFAULT_MODE = os.environ.get('ECA_TIMELINE_MODE', 'webgl')
+
+
+def apply_layout(fig, filtered_df):
+    fig.update_layout(
+        title="Campaign Timeline by Parent Campaign",
+        yaxis_title="Parent Campaign",
+        xaxis_title="Days Since First Interaction",
+        xaxis=dict(
+            range=[0, filtered_df['days_from_first'].max() * 1.1],
+            tickmode="array",
+            tickvals=list(range(0, int(filtered_df['days_from_first'].max()) + 30, 30)),
+            gridcolor='lightgray',
+            griddash='dot',
+            showgrid=True
+        ),
+        showlegend=True,
+        legend_title="Interaction Types",
+        template="plotly_white",
+        height=600,
+        barmode='overlay',
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=1.02,
+            traceorder='normal'
+        )
+    )
+    return fig
+
+
+def build_figure_legacy(filtered_df):
+    """Original per-point figure: one Bar per campaign and one Scatter per interaction"""
+    fig = go.Figure()
+    legend_items = []
+    for interaction_type in ordered_types:
+        type_data = filtered_df[filtered_df['interactiontype'] == interaction_type]
+        if not type_data.empty:
+            for parent_campaign in filtered_df['parentcampaignname'].unique():
+                campaign_data = type_data[type_data['parentcampaignname'] == parent_campaign]
+                if interaction_type == ordered_types[0]:
+                    max_days = filtered_df[filtered_df['parentcampaignname'] == parent_campaign]['days_from_first'].max()
+                    fig.add_trace(go.Bar(
+                        name=parent_campaign,
+                        y=[parent_campaign],
+                        x=[max_days],
+                        marker_color='lightgray',
+                        width=0.5,
+                        orientation='h',
+                        showlegend=False
+                    ))
+                for _, row in campaign_data.iterrows():
+                    if ("1st Time" in interaction_type and row['days_from_first'] != 0):
+                        continue
+                    fig.add_trace(go.Scatter(
+                        y=[parent_campaign],
+                        x=[row['days_from_first']],
+                        mode='markers',
+                        marker=dict(
+                            color=color_map[interaction_type],
+                            size=10,
+                            symbol='line-ns',
+                            line=dict(width=3, color=color_map[interaction_type])
+                        ),
+                        name=interaction_type,
+                        showlegend=(interaction_type not in legend_items),
+                        customdata=[[parent_campaign, int(row['days_from_first']), interaction_type]],
+                        hovertemplate=(
+                            f"Campaign: {parent_campaign}<br>"
+                            f"Interaction Type: {interaction_type}<br>"
+                            f"Days after first interaction: {int(row['days_from_first'])}<br>"
+                            f"Click for details<extra></extra>"
+                        )
+                    ))
+                    if interaction_type not in legend_items:
+                        legend_items.append(interaction_type)
+    return apply_layout(fig, filtered_df)
+
+
+def build_figure_vectorized(filtered_df, webgl=True):
+    """Same timeline from column arrays: one marker trace per type, one Bar for all spans"""
+    scatter = go.Scattergl if webgl else go.Scatter
+    fig = go.Figure()
+
+    campaigns = filtered_df['parentcampaignname'].unique()
+    # Rank campaigns by first appearance so points (and therefore the y-axis
+    # category order) come out in the same order as the per-point loop
+    campaign_rank = {name: i for i, name in enumerate(campaigns)}
+    types = filtered_df['interactiontype']
+
+    if (types == ordered_types[0]).any():
+        max_days = filtered_df.groupby('parentcampaignname', sort=False, observed=True)['days_from_first'].max()
+        fig.add_trace(go.Bar(
+            name="Campaign span",
+            y=list(campaigns),
+            x=max_days.reindex(campaigns).tolist(),
+            marker_color='lightgray',
+            width=0.5,
+            orientation='h',
+            showlegend=False,
+            hovertemplate="%{x}<extra>%{y}</extra>"
+        ))
+
+    for interaction_type in ordered_types:
+        type_data = filtered_df[types == interaction_type]
+        if type_data.empty:
+            continue
+        keep = type_data['parentcampaignname'].notna() & type_data['days_from_first'].notna()
+        if "1st Time" in interaction_type:
+            keep &= type_data['days_from_first'] == 0
+        type_data = type_data[keep]
+        if type_data.empty:
+            continue
+        order = np.argsort(type_data['parentcampaignname'].map(campaign_rank).to_numpy(), kind='stable')
+        names = type_data['parentcampaignname'].to_numpy()[order]
+        days = type_data['days_from_first'].to_numpy()[order].astype(int)
+        customdata = np.empty((len(names), 3), dtype=object)
+        customdata[:, 0] = names
+        customdata[:, 1] = days
+        customdata[:, 2] = interaction_type
+        fig.add_trace(scatter(
+            y=names,
+            x=days,
+            mode='markers',
+            marker=dict(
+                color=color_map[interaction_type],
+                size=10,
+                symbol='line-ns',
+                line=dict(width=3, color=color_map[interaction_type])
+            ),
+            name=interaction_type,
+            showlegend=True,
+            customdata=customdata,
+            hovertemplate=(
+                "Campaign: %{customdata[0]}<br>"
+                f"Interaction Type: {interaction_type}<br>"
+                "Days after first interaction: %{customdata[1]}<br>"
+                "Click for details<extra></extra>"
+            )
+        ))
+    return apply_layout(fig, filtered_df)
+
+
+def float_days(filtered_df):
+    if filtered_df['days_from_first'].dtype != 'float64':
+        # Compact frames hold nullable Int32 days; the builders and plotly expect NaN for missing
+        filtered_df = filtered_df.assign(days_from_first=filtered_df['days_from_first'].astype('float64'))
+    return filtered_df
+
+
+def build_figure(filtered_df, mode=None):
+    """Build the timeline figure in the requested (or configured) mode"""
+    mode = mode or DEFAULT_MODE
+    filtered_df = float_days(filtered_df)
+    if mode == 'legacy':
+        return build_figure_legacy(filtered_df)
+    if mode not in TIMELINE_MODES:
+        raise ValueError(f"Unknown timeline mode: {mode}")
+    return build_figure_vectorized(filtered_df, webgl=(mode == 'webgl'))
+
+
+# ------------------------------
+# Level of detail for large timelines
+#
+# Past LOD_MAX_CAMPAIGNS campaigns or LOD_MAX_POINTS markers the timeline is
+# sent as a campaign x week heatmap of interaction counts, at most
+# HEATMAP_MAX_ROWS x HEATMAP_MAX_COLUMNS cells (neighbouring campaigns share
+# a row and weeks widen to fit), so its size does not grow with the data.
+# Zooming in (relayoutData) re-plans the view for the zoomed window, which
+# switches back to full-resolution markers once it is under both limits.
+#
+# A view is a small dict describing what a figure shows: the campaigns
+# [lo, hi) of campaign_order(), band campaigns per row, the day window
+# [x0, x1] (None = all) and its kind ('full', 'markers' or 'heatmap').
+# zoom_window() turns the next relayoutData back into a window with it.
+
+LOD_MAX_CAMPAIGNS = int(os.environ.get('ECA_LOD_CAMPAIGNS', 150))
+LOD_MAX_POINTS = int(os.environ.get('ECA_LOD_POINTS', 5000))
+HEATMAP_MAX_ROWS = 120
+HEATMAP_MAX_COLUMNS = 60
+LOD_HEIGHT = 900
+
+
+def campaign_order(filtered_df):
+    """Parent campaigns in order of first appearance, as the timeline lists them"""
+    return np.asarray(pd.unique(filtered_df['parentcampaignname'].dropna().astype(object)), dtype=object)
+
+
+def timeline_points(filtered_df):
+    """The rows drawn as markers: known types, first-time rows only on their day 0"""
+    types = filtered_df['interactiontype']
+    days = filtered_df['days_from_first']
+    keep = types.isin(ordered_types) & filtered_df['parentcampaignname'].notna() & days.notna()
+    keep &= ~types.isin(ordered_types[:2]) | (days == 0)
+    return filtered_df[keep]
+
+
+def plan_view(filtered_df, lo=0, hi=None, x0=None, x1=None):
+    """The view for campaigns [lo, hi) and days [x0, x1] at the level of detail the data allows"""
+    filtered_df = float_days(filtered_df)
+    campaigns = campaign_order(filtered_df)
+    hi = len(campaigns) if hi is None else max(lo + 1, min(hi, len(campaigns)))
+    points = _window_points(filtered_df, campaigns[lo:hi], x0, x1)
+    view = {'lo': lo, 'hi': hi, 'band': 1, 'x0': x0, 'x1': x1}
+    if hi - lo <= LOD_MAX_CAMPAIGNS and len(points) <= LOD_MAX_POINTS:
+        whole = lo == 0 and hi == len(campaigns) and x0 is None and x1 is None
+        view['kind'] = 'full' if whole else 'markers'
+    else:
+        view['kind'] = 'heatmap'
+        view['band'] = -(-(hi - lo) // HEATMAP_MAX_ROWS)
+    return view
+
+
+def _window_points(filtered_df, selected, x0, x1):
+    points = timeline_points(filtered_df)
+    keep = points['parentcampaignname'].isin(selected)
+    if x0 is not None:
+        keep &= points['days_from_first'] >= x0
+    if x1 is not None:
+        keep &= points['days_from_first'] <= x1
+    return points[keep]
+
+
+def build_view(filtered_df, view, mode=None):
+    """The figure for a view from plan_view()"""
+    filtered_df = float_days(filtered_df)
+    if view['kind'] == 'full':
+        return build_figure(filtered_df, mode)
+    selected = campaign_order(filtered_df)[view['lo']:view['hi']]
+    points = _window_points(filtered_df, selected, view['x0'], view['x1'])
+    if view['kind'] == 'heatmap':
+        return build_heatmap(points, selected, view)
+    if points.empty:
+        return go.Figure()
+    fig = build_figure(points, 'svg' if mode == 'legacy' else mode)
+    # Pin the row order to the campaign order so zoom_window can map rows back to campaigns
+    fig.update_layout(height=LOD_HEIGHT, yaxis=dict(categoryorder='array', categoryarray=list(selected)))
+    if view['x0'] is not None and view['x1'] is not None:
+        fig.update_xaxes(range=[view['x0'], view['x1']], tickmode='auto')
+    return fig
+
+
+def build_timeline(filtered_df, mode=None):
+    """The unzoomed timeline: the full figure, or its heatmap overview past the LOD limits"""
+    return build_view(filtered_df, plan_view(filtered_df), mode)
+
+
+def build_heatmap(points, selected, view):
+    """Interactions per (campaign band, day bin), at most HEATMAP_MAX_ROWS x HEATMAP_MAX_COLUMNS"""
+    band = view['band']
+    days = points['days_from_first'].to_numpy(dtype=float)
+    first = view['x0'] if view['x0'] is not None else (days.min() if len(days) else 0)
+    last = view['x1'] if view['x1'] is not None else (days.max() if len(days) else 0)
+    width = 7 * max(1, int(np.ceil((last - first + 1) / 7 / HEATMAP_MAX_COLUMNS)))
+    columns = int((last - first) // width) + 1
+
+    rank = {name: i for i, name in enumerate(selected)}
+    rows = points['parentcampaignname'].astype(object).map(rank).to_numpy(dtype=int) // band
+    counts = np.zeros((-(-len(selected) // band), columns))
+    np.add.at(counts, (rows, ((days - first) // width).astype(int)), 1)
+    counts[counts == 0] = np.nan
+
+    labels = [
+        selected[start] if band == 1 or start + 1 == len(selected)
+        else f"{selected[start]} … (+{min(band, len(selected) - start) - 1} more)"
+        for start in range(0, len(selected), band)
+    ]
+    fig = go.Figure(go.Heatmap(
+        z=counts,
+        x=first + width * (np.arange(columns) + 0.5),
+        y=labels,
+        colorscale='Blues',
+        colorbar=dict(title="Interactions"),
+        hoverongaps=False,
+        hovertemplate="%{y}<br>Days %{x:.0f} ± " + str(width // 2) + "<br>Interactions: %{z}<extra></extra>",
+    ))
+    fig.update_layout(
+        title=f"Campaign Timeline by Parent Campaign (interactions per {width // 7}-week bin; zoom in for detail)",
+        yaxis_title="Parent Campaign",
+        xaxis_title="Days Since First Interaction",
+        xaxis=dict(gridcolor='lightgray', griddash='dot', showgrid=True),
+        yaxis=dict(categoryorder='array', categoryarray=labels),
+        template="plotly_white",
+        height=LOD_HEIGHT,
+    )
+    return fig
+
+
+def timeline_columns(filtered_df, mode=None):
+    """df_filtered as integer-coded columns for the clientside site filter (assets/timeline.js)
+
+    Campaign, type and site are codes into the campaigns, types and sites
+    lists (-1 = missing or not a timeline type); days are ints or None. The
+    layout is the unfiltered figure's; the script only redoes the x range.
+    """
+    mode = mode or DEFAULT_MODE
+    filtered_df = float_days(filtered_df)
+    campaigns = campaign_order(filtered_df)
+    sites = sorted(filtered_df['site'].dropna().unique()) if 'site' in filtered_df.columns else []
+
+    def codes(column, categories):
+        if column not in filtered_df.columns:
+            return [-1] * len(filtered_df)
+        return pd.Categorical(filtered_df[column].astype(object), categories=categories).codes.tolist()
+
+    days = filtered_df['days_from_first'].to_numpy()
+    return {
+        'campaigns': list(campaigns),
+        'types': ordered_types,
+        'colors': [color_map[t] for t in ordered_types],
+        'sites': list(sites),
+        'campaign': codes('parentcampaignname', campaigns),
+        'type': codes('interactiontype', ordered_types),
+        'site': codes('site', sites),
+        'days': [None if np.isnan(day) else int(day) for day in days],
+        'trace': 'scattergl' if mode == 'webgl' else 'scatter',
+        'layout': apply_layout(go.Figure(), filtered_df).layout.to_plotly_json(),
+    }
+
+
+def zoom_window(relayout_data, view):
+    """Window (lo, hi, x0, x1) for a relayout of the figure drawn for view
+
+    None means there is nothing to redraw (not a zoom, or a figure small
+    enough to zoom client-side); an empty tuple means back to the overview.
+    """
+    if not relayout_data or not view or view.get('kind') == 'full':
+        return None
+    if relayout_data.get('xaxis.autorange') or relayout_data.get('yaxis.autorange'):
+        return ()
+    x_range = _axis_range(relayout_data, 'xaxis')
+    y_range = _axis_range(relayout_data, 'yaxis')
+    if x_range is None and y_range is None:
+        return None
+    lo, hi, band = view['lo'], view['hi'], view['band']
+    if y_range is not None:
+        # Category i is drawn at y = i; keep the rows whose centre is in range
+        rows = -(-(hi - lo) // band)
+        first = min(rows - 1, max(0, int(np.ceil(y_range[0]))))
+        last = max(first, min(rows - 1, int(np.floor(y_range[1]))))
+        lo, hi = lo + first * band, min(hi, lo + (last + 1) * band)
+    x0, x1 = (view['x0'], view['x1']) if x_range is None else (float(x_range[0]), float(x_range[1]))
+    return lo, hi, x0, x1
+
+
+def _axis_range(relayout_data, axis):
+    if f'{axis}.range[0]' in relayout_data:
+        return sorted([relayout_data[f'{axis}.range[0]'], relayout_data[f'{axis}.range[1]']])
+    if f'{axis}.range' in relayout_data:
+        return sorted(relayout_data[f'{axis}.range'])
+    return None
+
+
+# ------------------------------
+# Figure cache for the site filter
+
+class FigureCache:
+    """Bounded LRU of built figures keyed by (data version, selected site)
+
+    Entries from an older data version are dropped the first time a newer
+    version is requested, so reloading the dataset invalidates the cache.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.version = None
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, version, site):
+        with self._lock:
+            if version != self.version:
+                self._figures.clear()
+                self.version = version
+            fig = self._figures.get(site)
+            if fig is not None:
+                self._figures.move_to_end(site)
+                self.hits += 1
+            return fig
+
+    def _store(self, version, site, fig):
+        with self._lock:
+            if version != self.version:
+                return
+            self._figures[site] = fig
+            self._figures.move_to_end(site)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+
+    def get_or_build(self, version, site, build):
+        fig = self._lookup(version, site)
+        if fig is None:
+            with self._lock:
+                self.misses += 1
+            fig = build(site)
+            self._store(version, site, fig)
+        return fig
+
+    def invalidate(self):
+        with self._lock:
+            self._figures.clear()
+            self.version = None
+
+    def warm(self, version, sites, build):
+        """Build every site's figure on a background thread"""
+        def run():
+            start = time.perf_counter()
+            for site in sites:
+                try:
+                    self.get_or_build(version, site, build)
+                except Exception as e:
+                    print(f"Error warming figure for site {site!r}: {str(e)}")
+            print(f"Warmed {len(sites)} timeline figures in {time.perf_counter() - start:.2f}s")
+        thread = threading.Thread(target=run, name="figure-cache-warm", daemon=True)
+        thread.start()
+        return thread
+
+    def info(self):
+        with self._lock:
+            return {'version': self.version, 'size': len(self._figures), 'maxsize': self.maxsize,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+# ------------------------------
+# Start-date scatter served by the Vercel entry point (api/index.py)
+
+def build_scatter_figure(df):
+    # plotly.express is slow to import and only the Drive-backed apps and bundle.py draw this
+    import plotly.express as px
+
+    fig = px.scatter(df,
+                     x='startdate',
+                     y='parentcampaignname',
+                     color='ecaactivitytype',
+                     title='Campaign Timeline')
+    fig.update_layout(
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        title_x=0.5,
+        margin=dict(l=20, r=20, t=40, b=20),
+        xaxis_title="Start Date",
+        yaxis_title="Parent Campaign Name",
+        legend_title="ECA Activity Type"
+    )
+    return fig
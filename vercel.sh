@@ -1,2 +1,7 @@
 #!/bin/bash
-if [ -f requirements.txt ]; then pip install -r requirements.txt; fi 
\ No newline at end of file
+if [ -f requirements.txt ]; then pip install -r requirements.txt; fi
+# Run the pipeline once at build time; the app loads the bundle instead of the workbooks.
+# bundle.py prints a WARNING when it can only bundle part of it, and exits 1 when it wrote nothing.
+if ! python bundle.py; then
+    echo "WARNING: no bundle was built; api/index.py will download and parse the Drive workbook at runtime" >&2
+fi
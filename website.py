@@ -1,140 +1,149 @@
 import os
-import json
-import re
+import functools
+import threading
+import time
 import traceback
-from datetime import datetime
 
-import pandas as pd
-import networkx as nx
 import plotly.graph_objects as go
 import dash
 from dash import html, dcc
 import dash_bootstrap_components as dbc
-from dash.dependencies import Input, Output
+from dash.dependencies import ClientsideFunction, Input, Output, State
 
-# ------------------------------
-# Setup file paths (assumes your Excel files are stored in a "data" folder in the project root)
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+import bundle
+import frame_cache
+import paths
+from incremental import build_frames_incremental
+from metrics import CallbackMetrics, callback_metrics_enabled, recorder, stage, timed
+from pipeline import build_frames, build_member_index, campaign_member_counts
+from rest_api import AggregateAPI
+from timeline import FigureCache, build_view, plan_view, timeline_columns, zoom_window
 
-input_path = os.path.join(DATA_DIR, "ECA Campaigns_FY25_ALL_v2.xlsx")
-members_path = os.path.join(DATA_DIR, "ECA Campaign Members_FY25_ALL.xlsx")
-v2_path = os.path.join(DATA_DIR, "ECA Campaigns_FY25_ALL_v2.xlsx")
+# ------------------------------
+# Source workbook paths (shared with bundle.py so its fingerprints match what load_data checks)
+input_path, members_path, v2_path = paths.input_path, paths.members_path, paths.v2_path
 
 # We no longer save output files since serverless functions are ephemeral.
-# output_path = os.path.join(DATA_DIR, "ECA_Campaigns_FY25_BINARY.xlsx")
-
-# Define Stata's epoch
-STATA_EPOCH = pd.Timestamp('1960-01-01')
+# output_path = os.path.join(paths.DATA_DIR, "ECA_Campaigns_FY25_BINARY.xlsx")
 
 # ------------------------------
-# Load and process the main data file
-df = pd.read_excel(input_path)
-df.columns = df.columns.str.lower().str.replace(' ', '')
-df['startdate'] = df['startdateandtime'].str.split(',').str[0]
-df['enddate'] = df['enddateandtime'].str.split(',').str[0]
-df['starttime'] = df['startdateandtime'].str.split(',').str[1]
-df['endtime'] = df['enddateandtime'].str.split(',').str[1]
-df.drop(columns=['startdateandtime', 'enddateandtime'], inplace=True)
-df['num_startdate'] = pd.to_datetime(df['startdate'], format='%m/%d/%Y', errors='coerce')
-df['num_startdate'] = (df['num_startdate'] - STATA_EPOCH).dt.days
-df['parents_id'] = df['parentcampaignname'].astype('category').cat.codes
-df.sort_values(by=['parentcampaignname', 'num_startdate'], inplace=True)
-df['num_campaigns'] = df.groupby('parentcampaignname').cumcount() + 1
-df['meeting'] = (df['ecaactivitytype'] == 'Meeting').astype(int)
-df['event'] = (df['ecaactivitytype'] == 'Event').astype(int)
-df['firsttime'] = ((df['interactiontype'] == "1st Time Inquiry – Requested by Org or Group") | 
-                   (df['interactiontype'] == "1st Time Outreach – Initiated by ECA Staff")).astype(int)
-df['frst_inquiry'] = (df['interactiontype'] == "1st Time Inquiry – Requested by Org or Group").astype(int)
-df['frst_outreach'] = (df['interactiontype'] == "1st Time Outreach – Initiated by ECA Staff").astype(int)
-df['followup_mtg'] = (df['interactiontype'] == "Follow Up Project Planning or Problem-Solving Meeting").astype(int)
-df['reoccurring'] = (df['interactiontype'] == "Reoccurring activity").astype(int)
-df['repeat'] = (df['interactiontype'] == "Repeat – For Purposes of Ongoing Participation or to Rep ECA").astype(int)
-df['community_mtg'] = (df['interactiontype'] == "Community Meeting").astype(int)
-df['standalone'] = (df['interactiontype'] == "Stand alone activity").astype(int)
-df['scheduling'] = (df['interactiontype'] == "Scheduling or Show-and-Tell Visit").astype(int)
-df['concerns'] = (df['interactiontype'] == "Resident, Institutional or City Concern").astype(int)
-df['other'] = (df['interactiontype'] == "Other, such as Room Request").astype(int)
+# Load and process the data files (served from the Parquet cache when the sources are unchanged).
+# Nothing is loaded at import time: get_data() loads on first use, and start_warmup()
+# does it on a background thread so the server can answer with a placeholder meanwhile.
+_data = None
+_data_lock = threading.Lock()
+_warmup_thread = None
 
-# ------------------------------
-# Process the members file
-members_df = pd.read_excel(members_path)
-members_filtered = members_df[
-    (members_df['Interaction Type'] == "1st Time Inquiry – Requested by Org or Group") | 
-    (members_df['Interaction Type'] == "1st Time Outreach – Initiated by ECA Staff")
-]
-unique_parent_campaigns = members_filtered['Parent Campaign: Campaign Name'].unique()
-
-# Filter main dataframe to include only interactions for these parent campaigns
-df_filtered = df[df['parentcampaignname'].isin(unique_parent_campaigns)]
-interaction_types = df['interactiontype'].dropna().unique()
-for interaction in interaction_types:
-    col_name = interaction.lower().replace(' ', '_').replace('–', '').replace('(', '').replace(')', '')
-    df_filtered[col_name] = (df_filtered['interactiontype'] == interaction).astype(int)
-df_filtered['total_interactions'] = df_filtered.groupby('parentcampaignname')['interactiontype'].transform('count')
-
-first_interactions = df_filtered[
-    (df_filtered['interactiontype'] == "1st Time Inquiry – Requested by Org or Group") | 
-    (df_filtered['interactiontype'] == "1st Time Outreach – Initiated by ECA Staff")
-].groupby('parentcampaignname')['num_startdate'].min()
-df_filtered['days_from_first'] = df_filtered.apply(
-    lambda row: row['num_startdate'] - first_interactions[row['parentcampaignname']], axis=1
-)
-mask = (df_filtered['days_from_first'] > 0) & (
-    (df_filtered['interactiontype'] == "1st Time Inquiry – Requested by Org or Group") |
-    (df_filtered['interactiontype'] == "1st Time Outreach – Initiated by ECA Staff")
-)
-df_filtered.loc[mask, 'days_from_first'] = None
+def load_data():
+    # One stage run per load: a JSON log line plus the numbers behind /metrics
+    with stage('load_data') as record:
+        sources = paths.sources()
+        # The deployment ships a prebuilt bundle (see bundle.py) instead of the workbooks
+        manifest = bundle.read_manifest()
+        if bundle.usable(manifest, sources):
+            start = time.perf_counter()
+            data = bundle.load(manifest=manifest)
+            print(f"Loaded bundle from {bundle.bundle_dir()} in {time.perf_counter() - start:.3f}s")
+        else:
+            # ECA_INCREMENTAL=1 recomputes only the parent campaigns that changed since the last export
+            build = build_frames_incremental if os.environ.get('ECA_INCREMENTAL') == '1' else build_frames
+            frames, stats = frame_cache.load_or_build(sources, lambda: build(input_path, members_path, v2_path))
+            data = dict(frames, **stats)
+            # Parent campaign -> sub-campaign -> affiliation -> names, so a modal click never scans members_df
+            data['member_index'] = build_member_index(frames['members_df'])
+            data['campaign_members'] = campaign_member_counts(frames['members_filtered'])
+        record['rows_out'] = len(data['df'])
 
-# ------------------------------
-# Process the v2 file for first-time interactions
-v2_df = pd.read_excel(v2_path)
-filtered_first_time = v2_df[
-    (v2_df['Interaction Type'] == "1st Time Inquiry – Requested by Org or Group") | 
-    (v2_df['Interaction Type'] == "1st Time Outreach – Initiated by ECA Staff")
-]
+    print("\nVerifying cleaned campaign names:")
+    print("First 5 campaign names:")
+    for name in data['df']['parentcampaignname'].unique()[:5]:
+        print(f"- {name}")
+    return data
 
-v2_first_time_total = len(filtered_first_time)
-unique_eca = members_filtered[members_filtered['ECA Affiliation Name'].notna()]['ECA Affiliation Name'].nunique()
-unique_campaigns = len(unique_parent_campaigns)
+def get_data():
+    """The loaded dataset, loading it on this thread if nobody has yet"""
+    global _data
+    if _data is None:
+        with _data_lock:
+            if _data is None:
+                start = time.perf_counter()
+                data = load_data()
+                render_campaign_details.cache_clear()
+                _data = data
+                print(f"Dashboard data ready in {time.perf_counter() - start:.2f}s")
+    return _data
 
-# ------------------------------
-# Utility: clean campaign names
-def clean_parent_campaign(name):
-    if isinstance(name, str):
-        if " - " in name:
-            name = name.split(" - ", 1)[1].strip()
-        prefixes = ["PARENT1: CEC", "PARENT 1: CEC", "PARENT1:", "PARENT 1:", "CEC"]
-        for prefix in prefixes:
-            if name.startswith(prefix):
-                name = name[len(prefix):].strip()
-        name = re.sub(r'^[\-\–]+', '', name).strip()
-        return name.strip()
-    return name
-
-df['parentcampaignname'] = df['parentcampaignname'].apply(clean_parent_campaign)
-df_filtered['parentcampaignname'] = df_filtered['parentcampaignname'].apply(clean_parent_campaign)
-members_df['Parent Campaign: Campaign Name'] = members_df['Parent Campaign: Campaign Name'].apply(clean_parent_campaign)
-members_filtered['Parent Campaign: Campaign Name'] = members_filtered['Parent Campaign: Campaign Name'].apply(clean_parent_campaign)
-
-print("\nVerifying cleaned campaign names:")
-print("First 5 campaign names:")
-for name in df['parentcampaignname'].unique()[:5]:
-    print(f"- {name}")
+def data_ready():
+    return _data is not None
+
+def warm_up():
+    """Load the data and start building every site's figure; returns that thread (or None)"""
+    data = get_data()
+    # Build the figure for every dropdown value up front so filter switches are cache hits
+    if 'site' in data['df_filtered'].columns:
+        sites = [None] + list(data['df_filtered']['site'].dropna().unique())
+        return figure_cache.warm(data['data_version'], sites, build_site_figure)
+    return None
+
+def start_warmup():
+    """Load the data on a background thread (idempotent)"""
+    global _warmup_thread
+    with _data_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=warm_up, name="dashboard-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
 
 # ------------------------------
 # Initialize the Dash app
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+# Callbacks target components that only exist once the full layout replaces the placeholder
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True)
+
+# Timeline (figure, view) pairs keyed by (data_version, site); reloading the data changes data_version.
+# Zoom windows are nearly all distinct, so they get their own small LRU and never evict the warmed sites.
+figure_cache = FigureCache(maxsize=int(os.environ.get('ECA_FIGURE_CACHE_SIZE', 32)))
+zoom_cache = FigureCache(maxsize=int(os.environ.get('ECA_ZOOM_CACHE_SIZE', 8)))
+
+# Campaign cards are served a page at a time; search and sort run in update_campaign_grid
+CARDS_PER_PAGE = int(os.environ.get('ECA_CARDS_PER_PAGE', 24))
+CARD_SORTS = [
+    {'label': "Name (A-Z)", 'value': 'name'},
+    {'label': "Most people", 'value': 'people_desc'},
+    {'label': "Fewest people", 'value': 'people_asc'},
+]
+
+def campaign_page(counts, search=None, sort='name', page=1):
+    """(campaigns on the page, matching campaigns, page, pages) for a search, sort and page number"""
+    if search:
+        needle = search.strip().lower()
+        names = [name for name in counts if needle in name.lower()]
+    else:
+        names = list(counts)
+    if sort == 'people_desc':
+        names.sort(key=lambda name: (-counts[name], name))
+    elif sort == 'people_asc':
+        names.sort(key=lambda name: (counts[name], name))
+    else:
+        names.sort()
+    pages = max(1, -(-len(names) // CARDS_PER_PAGE))
+    page = min(max(1, page or 1), pages)
+    return names[(page - 1) * CARDS_PER_PAGE:page * CARDS_PER_PAGE], len(names), page, pages
 
-def create_campaign_boxes():
+def page_summary(shown, total, page):
+    if not total:
+        return "No matching campaigns"
+    first = (page - 1) * CARDS_PER_PAGE + 1
+    return f"Showing {first}-{first + len(shown) - 1} of {total} campaigns"
+
+@timed(run=False)
+def create_campaign_boxes(campaigns, counts):
     campaign_boxes = []
-    for campaign in sorted(members_filtered['Parent Campaign: Campaign Name'].unique()):
-        campaign_data = members_filtered[members_filtered['Parent Campaign: Campaign Name'] == campaign]
+    for campaign in campaigns:
         box = dbc.Col(
             dbc.Card([
                 dbc.CardBody([
                     html.H5(campaign, className="card-title"),
-                    html.P(f"People involved: {len(campaign_data)}", className="card-text"),
+                    html.P(f"People involved: {counts[campaign]}", className="card-text"),
                     dbc.Button("View Details", id={'type': 'campaign-button', 'index': campaign}, color="primary")
                 ])
             ], className="h-100 shadow-sm"),
@@ -143,66 +152,140 @@ def create_campaign_boxes():
         campaign_boxes.append(box)
     return campaign_boxes
 
-app.layout = html.Div([
-    # Header
-    html.Div([
-        html.H1("ECA Engagement Dashboard", className="display-4 text-center mb-4"),
-        html.H4("First-Time Interactions Analysis", className="text-center text-muted mb-5")
-    ], className="container mt-4"),
+@timed(run=False)
+def dashboard_layout(data):
+    df = data['df']
+    cards, total, page, pages = campaign_page(data['campaign_members'])
+    columns = client_timeline_columns(data)
+    return html.Div([
+        # Header
+        html.Div([
+            html.H1("ECA Engagement Dashboard", className="display-4 text-center mb-4"),
+            html.H4("First-Time Interactions Analysis", className="text-center text-muted mb-5")
+        ], className="container mt-4"),
 
-    # Main stats row
-    dbc.Row([
-        dbc.Col([
-            html.Div([
-                html.H2(f"{v2_first_time_total}", className="display-3 text-primary"),
-                html.P("Total First-Time Interactions", className="lead")
-            ], className="text-center p-4 border rounded")
-        ], width=4),
-        dbc.Col([
-            html.Div([
-                html.H2(f"{unique_eca}", className="display-3 text-success"),
-                html.P("Unique ECA Affiliations", className="lead")
-            ], className="text-center p-4 border rounded")
-        ], width=4),
-        dbc.Col([
-            html.Div([
-                html.H2(f"{unique_campaigns}", className="display-3 text-info"),
-                html.P("Parent Campaigns", className="lead")
-            ], className="text-center p-4 border rounded")
-        ], width=4),
-    ], className="mb-5"),
-
-    # Campaign boxes
-    dbc.Row(create_campaign_boxes(), className="mb-4"),
-
-    # Dropdown for site filter (if column exists)
-    html.Div([
-        dcc.Dropdown(
-            id='site-filter',
-            options=[{'label': site, 'value': site} for site in df['site'].unique()] if 'site' in df.columns else [],
-            placeholder="Select a site"
-        )
-    ], className="mb-4"),
+        # Main stats row
+        dbc.Row([
+            dbc.Col([
+                html.Div([
+                    html.H2(f"{data['v2_first_time_total']}", className="display-3 text-primary"),
+                    html.P("Total First-Time Interactions", className="lead")
+                ], className="text-center p-4 border rounded")
+            ], width=4),
+            dbc.Col([
+                html.Div([
+                    html.H2(f"{data['unique_eca']}", className="display-3 text-success"),
+                    html.P("Unique ECA Affiliations", className="lead")
+                ], className="text-center p-4 border rounded")
+            ], width=4),
+            dbc.Col([
+                html.Div([
+                    html.H2(f"{data['unique_campaigns']}", className="display-3 text-info"),
+                    html.P("Parent Campaigns", className="lead")
+                ], className="text-center p-4 border rounded")
+            ], width=4),
+        ], className="mb-5"),
+
+        # Campaign boxes: only the first page is in the layout
+        dbc.Row([
+            dbc.Col(dcc.Input(id='campaign-search', type='search', debounce=True,
+                              placeholder="Search campaigns", className="form-control"), width=6),
+            dbc.Col(dcc.Dropdown(id='campaign-sort', options=CARD_SORTS, value='name', clearable=False), width=3),
+            dbc.Col(html.Div(page_summary(cards, total, page), id='campaign-count', className="text-muted pt-2"), width=3),
+        ], className="mb-3"),
+        dbc.Row(create_campaign_boxes(cards, data['campaign_members']), id='campaign-grid', className="mb-2"),
+        dbc.Pagination(id='campaign-page', active_page=page, max_value=pages, fully_expanded=False,
+                       first_last=True, previous_next=True, className="justify-content-center mb-4"),
+
+        # Dropdown for site filter (if column exists)
+        html.Div([
+            dcc.Dropdown(
+                id='site-filter',
+                options=[{'label': site, 'value': site} for site in df['site'].unique()] if 'site' in df.columns else [],
+                placeholder="Select a site"
+            )
+        ], className="mb-4"),
+
+        # Time graph, what it currently shows (see timeline.plan_view), and the stores
+        # the clientside callbacks use to filter it in the browser or hand over to the server
+        dcc.Graph(id='time-graph'),
+        dcc.Store(id='timeline-view', data={'kind': 'full'} if columns else None),
+        dcc.Store(id='timeline-columns', data=columns),
+        dcc.Store(id='timeline-site'),
+        dcc.Store(id='timeline-zoom'),
+
+        # Modal for campaign details
+        dbc.Modal([
+            dbc.ModalHeader(dbc.ModalTitle("Campaign Details")),
+            dbc.ModalBody(id="campaign-details-body"),
+            dbc.ModalFooter(dbc.Button("Close", id="close-modal", className="ms-auto"))
+        ], id="campaign-modal", size="lg"),
+
+        # Footer
+        html.Footer([
+            html.P("Data source: ECA Campaign Members FY25", className="text-muted text-center")
+        ], className="mt-5")
+    ], className="container-fluid px-4 py-4")
+
+def client_timeline_columns(data):
+    """Compact df_filtered for filtering in the browser, or None to filter on the server
+
+    Only with ECA_CLIENTSIDE_FILTER=1, and only while the whole timeline is under
+    the level-of-detail limits; past them the server's heatmap views take over.
+    """
+    if os.environ.get('ECA_CLIENTSIDE_FILTER') != '1':
+        return None
+    if 'timeline_columns' not in data:
+        df_filtered = data['df_filtered']
+        full = plan_view(df_filtered)['kind'] == 'full' if not df_filtered.empty else False
+        data['timeline_columns'] = timeline_columns(df_filtered) if full else None
+    return data['timeline_columns']
 
-    # Time graph
-    dcc.Graph(id='time-graph'),
+def placeholder_layout():
+    """Served until the data is ready; polls and reloads the page once it is"""
+    return html.Div([
+        dcc.Location(id='warmup-location', refresh=True),
+        dcc.Interval(id='warmup-poll', interval=1000),
+        html.Div([
+            html.H1("ECA Engagement Dashboard", className="display-4 text-center mb-4"),
+            dbc.Spinner(color="primary"),
+            html.P("Loading campaign data...", className="text-center text-muted mt-3")
+        ], className="container mt-4 text-center")
+    ], className="container-fluid px-4 py-4")
 
-    # Modal for campaign details
-    dbc.Modal([
-        dbc.ModalHeader(dbc.ModalTitle("Campaign Details")),
-        dbc.ModalBody(id="campaign-details-body"),
-        dbc.ModalFooter(dbc.Button("Close", id="close-modal", className="ms-auto"))
-    ], id="campaign-modal", size="lg"),
+def serve_layout():
+    if not data_ready():
+        start_warmup()
+        return placeholder_layout()
+    return dashboard_layout(get_data())
 
-    # Footer
-    html.Footer([
-        html.P("Data source: ECA Campaign Members FY25", className="text-muted text-center")
-    ], className="mt-5")
-], className="container-fluid px-4 py-4")
+app.layout = serve_layout
 
 # ------------------------------
 # Dash callbacks
 
+@functools.lru_cache(maxsize=256)
+def render_campaign_details(campaign_name):
+    """Header and per-sub-campaign participant lists for one parent campaign"""
+    sub_campaigns = get_data()['member_index'][campaign_name]
+    return (
+        html.H4(campaign_name, className="mb-4"),
+        html.Div([
+            html.Div([
+                html.H5(f"Campaign: {sub_campaign}", className="mt-4 mb-3"),
+                html.H6("ECA Affiliations and Participants:", className="mb-2"),
+                html.Ul([
+                    html.Li([
+                        html.Strong(f"{eca}: "),
+                        ", ".join(names)
+                    ])
+                    for eca, names in sorted(sub_campaigns[sub_campaign].items())
+                ])
+            ])
+            for sub_campaign in sorted(sub_campaigns)
+        ])
+    )
+
 @app.callback(
     [Output("campaign-modal", "is_open"), Output("campaign-details-body", "children")],
     [Input({"type": "campaign-button", "index": dash.ALL}, "n_clicks"),
@@ -215,38 +298,33 @@ def toggle_modal(campaign_clicks, click_data, close_clicks):
     if not ctx.triggered:
         return False, ""
     trigger_id = ctx.triggered[0]["prop_id"]
+    days_after = None
     try:
         if "close-modal" in trigger_id:
             return False, ""
         if "campaign-button" in trigger_id:
-            button_id = json.loads(trigger_id.split('.')[0])
-            campaign_name = button_id['index']
+            # A new page of cards re-renders the buttons, which fires with n_clicks unset
+            if not ctx.triggered[0]['value']:
+                return dash.no_update, dash.no_update
+            # Dash parses the pattern-matching id itself, dots in the campaign name included
+            campaign_name = ctx.triggered_id['index']
         elif "time-graph.clickData" in trigger_id:
-            campaign_name = click_data['points'][0]['customdata'][0]
-            days_after = click_data['points'][0]['customdata'][1]
+            point = click_data['points'][0]
+            if 'customdata' not in point:
+                # A heatmap cell: its row label is the campaign, or a band of them (zoom in instead)
+                campaign_name = point.get('y')
+                if campaign_name not in get_data()['member_index']:
+                    return dash.no_update, dash.no_update
+            else:
+                campaign_name = point['customdata'][0]
+                days_after = point['customdata'][1]
         else:
             return False, ""
-        campaign_data = members_df[members_df['Parent Campaign: Campaign Name'] == campaign_name]
-        if campaign_data.empty:
+        if campaign_name not in get_data()['member_index']:
             return True, html.Div("No data available for this campaign")
         details = html.Div([
-            html.H4(campaign_name, className="mb-4"),
-            html.Div([
-                html.Div([
-                    html.H5(f"Campaign: {sub_campaign}", className="mt-4 mb-3"),
-                    html.H6("ECA Affiliations and Participants:", className="mb-2"),
-                    html.Ul([
-                        html.Li([
-                            html.Strong(f"{eca}: "),
-                            ", ".join(sorted(set(names)))
-                        ])
-                        for eca, names in campaign_data[campaign_data['Campaign Name'] == sub_campaign].groupby('ECA Affiliation Name')['Full Name'].apply(list).items()
-                        if pd.notna(eca)
-                    ])
-                ])
-                for sub_campaign in sorted(campaign_data['Campaign Name'].unique())
-            ]),
-            html.Div(f"Days after first interaction: {days_after}" if 'days_after' in locals() else "", className="mt-3 text-muted")
+            *render_campaign_details(campaign_name),
+            html.Div(f"Days after first interaction: {days_after}" if days_after is not None else "", className="mt-3 text-muted")
         ])
         return True, details
     except Exception as e:
@@ -254,116 +332,113 @@ def toggle_modal(campaign_clicks, click_data, close_clicks):
         return False, html.Div("An error occurred while loading campaign details")
 
 @app.callback(
-    Output('time-graph', 'figure'),
-    Input('site-filter', 'value')
+    [Output('campaign-grid', 'children'), Output('campaign-count', 'children'),
+     Output('campaign-page', 'max_value'), Output('campaign-page', 'active_page')],
+    [Input('campaign-search', 'value'), Input('campaign-sort', 'value'), Input('campaign-page', 'active_page')],
+    prevent_initial_call=True
+)
+def update_campaign_grid(search, sort, active_page):
+    ctx = dash.callback_context
+    # A new search or sort starts again from the first page
+    if ctx.triggered and not ctx.triggered[0]['prop_id'].startswith('campaign-page.'):
+        active_page = 1
+    counts = get_data()['campaign_members']
+    cards, total, page, pages = campaign_page(counts, search, sort, active_page)
+    return create_campaign_boxes(cards, counts), page_summary(cards, total, page), pages, page
+
+# Site changes and zooms go through assets/timeline.js first: with timeline-columns
+# it redraws the site in the browser, otherwise it forwards the site (timeline-site)
+# or a zoom the server must redraw (timeline-zoom) to update_time_graph
+app.clientside_callback(
+    ClientsideFunction(namespace='eca', function_name='filterTimeline'),
+    [Output('time-graph', 'figure'), Output('timeline-site', 'data')],
+    Input('site-filter', 'value'),
+    State('timeline-columns', 'data')
+)
+
+app.clientside_callback(
+    ClientsideFunction(namespace='eca', function_name='gateZoom'),
+    Output('timeline-zoom', 'data'),
+    Input('time-graph', 'relayoutData'),
+    State('timeline-view', 'data'),
+    prevent_initial_call=True
+)
+
+@app.callback(
+    [Output('time-graph', 'figure', allow_duplicate=True), Output('timeline-view', 'data')],
+    [Input('timeline-site', 'data'), Input('timeline-zoom', 'data')],
+    State('timeline-view', 'data'),
+    prevent_initial_call=True
 )
-def update_time_graph(selected_site):
+def update_time_graph(selected_site, relayout_data, view):
     try:
-        filtered_df = df_filtered[df_filtered['site'] == selected_site] if selected_site else df_filtered
+        ctx = dash.callback_context
+        version = get_data()['data_version']
+        window = None
+        if ctx.triggered and ctx.triggered[0]['prop_id'] == 'timeline-zoom.data':
+            window = zoom_window(relayout_data, view)
+            if window is None:
+                return dash.no_update, dash.no_update
+        filtered_df = site_frame(selected_site)
         if filtered_df.empty:
-            return go.Figure()
-        ordered_types = [
-            "1st Time Inquiry – Requested by Org or Group",
-            "1st Time Outreach – Initiated by ECA Staff",
-            "Follow Up Project Planning or Problem-Solving Meeting",
-            "Reoccurring activity",
-            "Repeat – For Purposes of Ongoing Participation or to Rep ECA",
-            "Community Meeting",
-            "Stand alone activity",
-            "Scheduling or Show-and-Tell Visit",
-            "Resident, Institutional or City Concern",
-            "Other, such as Room Request"
-        ]
-        color_map = {
-            ordered_types[0]: "#1f77b4",
-            ordered_types[1]: "#2ca02c",
-            ordered_types[2]: "#FF0000",
-            ordered_types[3]: "#00FF00",
-            ordered_types[4]: "#0000FF",
-            ordered_types[5]: "#FFA500",
-            ordered_types[6]: "#800080",
-            ordered_types[7]: "#008080",
-            ordered_types[8]: "#FF69B4",
-            ordered_types[9]: "#808080"
-        }
-        fig = go.Figure()
-        legend_items = []
-        for interaction_type in ordered_types:
-            type_data = filtered_df[filtered_df['interactiontype'] == interaction_type]
-            if not type_data.empty:
-                for parent_campaign in filtered_df['parentcampaignname'].unique():
-                    campaign_data = type_data[type_data['parentcampaignname'] == parent_campaign]
-                    if interaction_type == ordered_types[0]:
-                        max_days = filtered_df[filtered_df['parentcampaignname'] == parent_campaign]['days_from_first'].max()
-                        fig.add_trace(go.Bar(
-                            name=parent_campaign,
-                            y=[parent_campaign],
-                            x=[max_days],
-                            marker_color='lightgray',
-                            width=0.5,
-                            orientation='h',
-                            showlegend=False
-                        ))
-                    for _, row in campaign_data.iterrows():
-                        if ("1st Time" in interaction_type and row['days_from_first'] != 0):
-                            continue
-                        fig.add_trace(go.Scatter(
-                            y=[parent_campaign],
-                            x=[row['days_from_first']],
-                            mode='markers',
-                            marker=dict(
-                                color=color_map[interaction_type],
-                                size=10,
-                                symbol='line-ns',
-                                line=dict(width=3, color=color_map[interaction_type])
-                            ),
-                            name=interaction_type,
-                            showlegend=(interaction_type not in legend_items),
-                            customdata=[[parent_campaign, int(row['days_from_first']), interaction_type]],
-                            hovertemplate=(
-                                f"Campaign: {parent_campaign}<br>"
-                                f"Interaction Type: {interaction_type}<br>"
-                                f"Days after first interaction: {int(row['days_from_first'])}<br>"
-                                f"Click for details<extra></extra>"
-                            )
-                        ))
-                        if interaction_type not in legend_items:
-                            legend_items.append(interaction_type)
-        fig.update_layout(
-            title="Campaign Timeline by Parent Campaign",
-            yaxis_title="Parent Campaign",
-            xaxis_title="Days Since First Interaction",
-            xaxis=dict(
-                range=[0, filtered_df['days_from_first'].max() * 1.1],
-                tickmode="array",
-                tickvals=list(range(0, int(filtered_df['days_from_first'].max()) + 30, 30)),
-                gridcolor='lightgray',
-                griddash='dot',
-                showgrid=True
-            ),
-            showlegend=True,
-            legend_title="Interaction Types",
-            template="plotly_white",
-            height=600,
-            barmode='overlay',
-            legend=dict(
-                yanchor="top",
-                y=0.99,
-                xanchor="left",
-                x=1.02,
-                traceorder='normal'
-            )
-        )
-        return fig
+            return go.Figure(), None
+        if window:
+            # Zoomed in: re-plan for the window; past the LOD limits it is still a (finer) heatmap
+            zoomed = plan_view(filtered_df, *window)
+            key = (selected_site, zoomed['lo'], zoomed['hi'], zoomed['x0'], zoomed['x1'])
+            return zoom_cache.get_or_build(version, key, lambda _: (build_view(filtered_df, zoomed), zoomed))
+        return figure_cache.get_or_build(version, selected_site, build_site_figure)
     except Exception as e:
         print(f"Error in update_time_graph: {str(e)}")
         traceback.print_exc()
-        return go.Figure()
+        return go.Figure(), None
+
+def site_frame(selected_site):
+    df_filtered = get_data()['df_filtered']
+    return df_filtered[df_filtered['site'] == selected_site] if selected_site else df_filtered
+
+def build_site_figure(selected_site):
+    """(figure, view) of the unzoomed timeline for a site"""
+    data = get_data()
+    filtered_df = site_frame(selected_site)
+    if filtered_df.empty:
+        return go.Figure(), None
+    view = plan_view(filtered_df)
+    if selected_site in data.get('timeline_figures', {}):
+        return bundle.read_figure(data['timeline_figures'][selected_site]), view
+    return build_view(filtered_df, view), view
+
+@app.callback(
+    Output('warmup-location', 'href'),
+    Input('warmup-poll', 'n_intervals'),
+    State('warmup-location', 'pathname'),
+    prevent_initial_call=True
+)
+def reload_when_ready(n_intervals, pathname):
+    start_warmup()
+    if not data_ready():
+        return dash.no_update
+    return pathname or '/'
 
 # ------------------------------
 # Expose the underlying Flask server as "application" for Vercel
+# (gunicorn -c gunicorn.conf.py runs it in preforked workers that share data loaded once in the master)
 application = app.server
 
+# JSON aggregates for other tools: /api/summary, /api/campaigns, /api/sites, /api/interaction-types
+AggregateAPI(get_data).register(app.server)
+
+# Pipeline stage timings (duration, rows in/out): /metrics, or /metrics?format=prometheus
+recorder.register(app.server)
+
+# Opt-in (ECA_CALLBACK_METRICS=1): per-callback latency, response size and errors at /metrics/callbacks
+if callback_metrics_enabled():
+    CallbackMetrics().install(app)
+
+# Start loading as soon as the process is up (ECA_WARMUP=0 leaves it to the first request)
+if os.environ.get('ECA_WARMUP', '1') != '0':
+    start_warmup()
+
 if __name__ == '__main__':
     app.run_server(debug=True)
 